@@ -10,6 +10,121 @@ import pickle
 import warnings
 warnings.filterwarnings('ignore')
 
+# Symptom vocabulary in feature-column order. 'fluid_overload' is listed twice;
+# it has a single column (its first position), as when the feature vector was a dict.
+ALL_SYMPTOMS = [
+    'itching', 'skin_rash', 'nodal_skin_eruptions', 'continuous_sneezing', 'shivering',
+    'chills', 'joint_pain', 'stomach_pain', 'acidity', 'ulcers_on_tongue', 'muscle_wasting',
+    'vomiting', 'burning_micturition', 'spotting_ urination', 'fatigue', 'weight_gain',
+    'anxiety', 'cold_hands_and_feets', 'mood_swings', 'weight_loss', 'restlessness',
+    'lethargy', 'patches_in_throat', 'irregular_sugar_level', 'cough', 'high_fever',
+    'sunken_eyes', 'breathlessness', 'sweating', 'dehydration', 'indigestion', 'headache',
+    'yellowish_skin', 'dark_urine', 'nausea', 'loss_of_appetite', 'pain_behind_the_eyes',
+    'back_pain', 'constipation', 'abdominal_pain', 'diarrhoea', 'mild_fever', 'yellow_urine',
+    'yellowing_of_eyes', 'acute_liver_failure', 'fluid_overload', 'swelling_of_stomach',
+    'swelled_lymph_nodes', 'malaise', 'blurred_and_distorted_vision', 'phlegm',
+    'throat_irritation', 'redness_of_eyes', 'sinus_pressure', 'runny_nose', 'congestion',
+    'chest_pain', 'weakness_in_limbs', 'fast_heart_rate', 'pain_during_bowel_movements',
+    'pain_in_anal_region', 'bloody_stool', 'irritation_in_anus', 'neck_pain', 'dizziness',
+    'cramps', 'bruising', 'obesity', 'swollen_legs', 'swollen_blood_vessels',
+    'puffy_face_and_eyes', 'enlarged_thyroid', 'brittle_nails', 'swollen_extremeties',
+    'excessive_hunger', 'extra_marital_contacts', 'drying_and_tingling_lips', 'slurred_speech',
+    'knee_pain', 'hip_joint_pain', 'muscle_weakness', 'stiff_neck', 'swelling_joints',
+    'movement_stiffness', 'spinning_movements', 'loss_of_balance', 'unsteadiness',
+    'weakness_of_one_body_side', 'loss_of_smell', 'bladder_discomfort', 'foul_smell_of urine',
+    'continuous_feel_of_urine', 'passage_of_gases', 'internal_itching', 'toxic_look_(typhos)',
+    'depression', 'irritability', 'muscle_pain', 'altered_sensorium', 'red_spots_over_body',
+    'belly_pain', 'abnormal_menstruation', 'dischromic _patches', 'watering_from_eyes',
+    'increased_appetite', 'polyuria', 'family_history', 'mucoid_sputum', 'rusty_sputum',
+    'lack_of_concentration', 'visual_disturbances', 'receiving_blood_transfusion',
+    'receiving_unsterile_injections', 'coma', 'stomach_bleeding', 'distention_of_abdomen',
+    'history_of_alcohol_consumption', 'fluid_overload', 'blood_in_sputum',
+    'prominent_veins_on_calf', 'palpitations', 'painful_walking', 'pus_filled_pimples',
+    'blackheads', 'scurring', 'skin_peeling', 'silver_like_dusting', 'small_dents_in_nails',
+    'inflammatory_nails', 'blister', 'red_sore_around_nose', 'yellow_crust_ooze'
+]
+SYMPTOM_FEATURES = [f'symptom_{s}' for s in dict.fromkeys(ALL_SYMPTOMS)]
+
+# Count features: how many of the listed symptoms (repeats included) fall in each group
+SYMPTOM_GROUPS = [
+    # Symptom categories
+    ('skin_symptoms_count', ['itching', 'skin_rash', 'nodal_skin_eruptions', 'dischromic _patches',
+                             'pus_filled_pimples', 'blackheads', 'scurring', 'skin_peeling',
+                             'silver_like_dusting', 'blister', 'red_sore_around_nose', 'yellow_crust_ooze']),
+    ('respiratory_symptoms_count', ['continuous_sneezing', 'cough', 'breathlessness', 'phlegm',
+                                    'throat_irritation', 'sinus_pressure', 'runny_nose', 'congestion']),
+    ('gastrointestinal_symptoms_count', ['stomach_pain', 'vomiting', 'nausea', 'abdominal_pain',
+                                         'diarrhoea', 'constipation', 'indigestion', 'loss_of_appetite']),
+    ('neurological_symptoms_count', ['headache', 'dizziness', 'mood_swings', 'anxiety', 'depression',
+                                     'irritability', 'altered_sensorium', 'coma']),
+    ('metabolic_symptoms_count', ['fatigue', 'weight_loss', 'weight_gain', 'irregular_sugar_level',
+                                  'excessive_hunger', 'polyuria', 'increased_appetite']),
+    # IMPROVED: Disease-specific symptom patterns with better differentiation
+    ('diabetes_symptom_score', ['fatigue', 'weight_loss', 'irregular_sugar_level', 'polyuria', 'increased_appetite']),
+    # 'slow_healing_wounds' is not in ALL_SYMPTOMS: it only counts here
+    ('diabetes_secondary_score', ['excessive_hunger', 'blurred_and_distorted_vision', 'slow_healing_wounds']),
+    ('hyperthyroidism_symptom_score', ['fatigue', 'weight_loss', 'mood_swings', 'restlessness', 'sweating']),
+    ('hyperthyroidism_secondary_score', ['fast_heart_rate', 'palpitations', 'enlarged_thyroid', 'anxiety']),
+    ('typhoid_symptom_score', ['chills', 'vomiting', 'high_fever', 'toxic_look_(typhos)', 'abdominal_pain']),
+    ('fungal_symptom_score', ['itching', 'skin_rash', 'nodal_skin_eruptions', 'dischromic _patches']),
+]
+
+ENHANCED_FEATURES = ['symptom_count'] + [name for name, _ in SYMPTOM_GROUPS] + [
+    'diabetes_indicators', 'hyperthyroidism_indicators',
+    'weight_loss_diabetes_context', 'weight_loss_hyperthyroidism_context', 'weight_loss_generic_context'
+]
+FEATURE_NAMES = SYMPTOM_FEATURES + ENHANCED_FEATURES
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+# Column of each known symptom in the count matrix: the vocabulary first (same
+# order as SYMPTOM_FEATURES), then symptoms that only appear in groups
+SYMPTOM_INDEX = {s: i for i, s in enumerate(dict.fromkeys(
+    ALL_SYMPTOMS + [s for _, group in SYMPTOM_GROUPS for s in group]))}
+# GROUP_MASKS[i, j] = 1 when symptom i belongs to group j
+GROUP_MASKS = np.zeros((len(SYMPTOM_INDEX), len(SYMPTOM_GROUPS)), dtype=np.int64)
+for j, (_, group) in enumerate(SYMPTOM_GROUPS):
+    GROUP_MASKS[[SYMPTOM_INDEX[s] for s in group], j] = 1
+
+SYMPTOM_COLUMNS = ['Symptom_1', 'Symptom_2', 'Symptom_3', 'Symptom_4']
+
+
+def encode_symptoms(rows, symptoms, n_rows):
+    """Feature matrix (n_rows, len(FEATURE_NAMES)) in one pass.
+    rows[k] is the row of the k-th listed symptom, symptoms[k] its name."""
+    rows = np.asarray(rows, dtype=np.intp)
+    codes = np.fromiter((SYMPTOM_INDEX.get(s, -1) for s in symptoms), dtype=np.intp, count=len(rows))
+    known = codes >= 0
+    counts = np.zeros((n_rows, len(SYMPTOM_INDEX)), dtype=np.int64)
+    np.add.at(counts, (rows[known], codes[known]), 1)
+    present = counts > 0
+
+    n_symptoms, n_groups = len(SYMPTOM_FEATURES), len(SYMPTOM_GROUPS)
+    X = np.empty((n_rows, len(FEATURE_NAMES)), dtype=np.int64)
+    X[:, :n_symptoms] = present[:, :n_symptoms]
+    X[:, n_symptoms] = np.bincount(rows, minlength=n_rows)  # symptom_count: every listed symptom
+    X[:, n_symptoms + 1:n_symptoms + 1 + n_groups] = counts @ GROUP_MASKS
+
+    def has(symptom):
+        return present[:, SYMPTOM_INDEX[symptom]]
+
+    # IMPROVED: Diabetes vs Hyperthyroidism differentiation and weight loss context
+    diabetes = has('irregular_sugar_level') | has('polyuria')
+    hyperthyroidism = has('mood_swings') | has('sweating')
+    weight_loss = has('weight_loss')
+    X[:, n_symptoms + 1 + n_groups:] = np.column_stack([
+        diabetes, hyperthyroidism,
+        weight_loss & diabetes, weight_loss & ~diabetes & hyperthyroidism, weight_loss & ~diabetes & ~hyperthyroidism
+    ])
+    return X
+
+
+def encode_symptom_lists(symptom_lists):
+    """Feature matrix for a list of symptom lists (one row each)"""
+    rows = [i for i, symptoms in enumerate(symptom_lists) for _ in symptoms]
+    names = [s for symptoms in symptom_lists for s in symptoms]
+    return encode_symptoms(rows, names, len(symptom_lists))
+
+
 class ImprovedEnhancedMedicalPredictor:
     def __init__(self):
         self.models = {}
@@ -42,153 +157,39 @@ class ImprovedEnhancedMedicalPredictor:
         if df is None:
             raise FileNotFoundError("Could not find symtoms_df.csv in any expected location")
         
-        # Create a more comprehensive dataset
-        enhanced_data = []
-        
-        for _, row in df.iterrows():
-            disease = row['Disease']
-            symptoms = [row['Symptom_1'], row['Symptom_2'], row['Symptom_3'], row['Symptom_4']]
-            symptoms = [s.strip() for s in symptoms if pd.notna(s) and s.strip()]
-            
-            # Create binary feature vector
-            feature_vector = self.create_feature_vector(symptoms)
-            
-            # Add enhanced features
-            enhanced_features = self.add_enhanced_features(symptoms, disease)
-            feature_vector.update(enhanced_features)
-            
-            enhanced_data.append({
-                'disease': disease,
-                'symptoms': symptoms,
-                'features': feature_vector
-            })
-        
-        return enhanced_data
+        # Encode every row in one pass: symptom cells in row order, NaN/blank dropped
+        cells = df[SYMPTOM_COLUMNS].to_numpy(dtype=object).ravel()
+        rows = np.repeat(np.arange(len(df)), len(SYMPTOM_COLUMNS))
+        listed = pd.notna(cells)
+        names = pd.Series(cells[listed]).str.strip().to_numpy()
+        rows = rows[listed]
+        keep = names != ''
+        
+        return {
+            'diseases': df['Disease'].tolist(),
+            'features': encode_symptoms(rows[keep], names[keep], len(df)),
+            'feature_names': list(FEATURE_NAMES)
+        }
     
     def create_feature_vector(self, symptoms):
         """Create binary feature vector for symptoms"""
-        # Define all possible symptoms
-        all_symptoms = [
-            'itching', 'skin_rash', 'nodal_skin_eruptions', 'continuous_sneezing', 'shivering',
-            'chills', 'joint_pain', 'stomach_pain', 'acidity', 'ulcers_on_tongue', 'muscle_wasting',
-            'vomiting', 'burning_micturition', 'spotting_ urination', 'fatigue', 'weight_gain',
-            'anxiety', 'cold_hands_and_feets', 'mood_swings', 'weight_loss', 'restlessness',
-            'lethargy', 'patches_in_throat', 'irregular_sugar_level', 'cough', 'high_fever',
-            'sunken_eyes', 'breathlessness', 'sweating', 'dehydration', 'indigestion', 'headache',
-            'yellowish_skin', 'dark_urine', 'nausea', 'loss_of_appetite', 'pain_behind_the_eyes',
-            'back_pain', 'constipation', 'abdominal_pain', 'diarrhoea', 'mild_fever', 'yellow_urine',
-            'yellowing_of_eyes', 'acute_liver_failure', 'fluid_overload', 'swelling_of_stomach',
-            'swelled_lymph_nodes', 'malaise', 'blurred_and_distorted_vision', 'phlegm',
-            'throat_irritation', 'redness_of_eyes', 'sinus_pressure', 'runny_nose', 'congestion',
-            'chest_pain', 'weakness_in_limbs', 'fast_heart_rate', 'pain_during_bowel_movements',
-            'pain_in_anal_region', 'bloody_stool', 'irritation_in_anus', 'neck_pain', 'dizziness',
-            'cramps', 'bruising', 'obesity', 'swollen_legs', 'swollen_blood_vessels',
-            'puffy_face_and_eyes', 'enlarged_thyroid', 'brittle_nails', 'swollen_extremeties',
-            'excessive_hunger', 'extra_marital_contacts', 'drying_and_tingling_lips', 'slurred_speech',
-            'knee_pain', 'hip_joint_pain', 'muscle_weakness', 'stiff_neck', 'swelling_joints',
-            'movement_stiffness', 'spinning_movements', 'loss_of_balance', 'unsteadiness',
-            'weakness_of_one_body_side', 'loss_of_smell', 'bladder_discomfort', 'foul_smell_of urine',
-            'continuous_feel_of_urine', 'passage_of_gases', 'internal_itching', 'toxic_look_(typhos)',
-            'depression', 'irritability', 'muscle_pain', 'altered_sensorium', 'red_spots_over_body',
-            'belly_pain', 'abnormal_menstruation', 'dischromic _patches', 'watering_from_eyes',
-            'increased_appetite', 'polyuria', 'family_history', 'mucoid_sputum', 'rusty_sputum',
-            'lack_of_concentration', 'visual_disturbances', 'receiving_blood_transfusion',
-            'receiving_unsterile_injections', 'coma', 'stomach_bleeding', 'distention_of_abdomen',
-            'history_of_alcohol_consumption', 'fluid_overload', 'blood_in_sputum',
-            'prominent_veins_on_calf', 'palpitations', 'painful_walking', 'pus_filled_pimples',
-            'blackheads', 'scurring', 'skin_peeling', 'silver_like_dusting', 'small_dents_in_nails',
-            'inflammatory_nails', 'blister', 'red_sore_around_nose', 'yellow_crust_ooze'
-        ]
-        
-        feature_vector = {}
-        for symptom in all_symptoms:
-            feature_vector[f'symptom_{symptom}'] = 1 if symptom in symptoms else 0
-        
-        return feature_vector
+        row = encode_symptom_lists([symptoms])[0]
+        return dict(zip(SYMPTOM_FEATURES, row[:len(SYMPTOM_FEATURES)].tolist()))
     
     def add_enhanced_features(self, symptoms, disease):
-        """Add enhanced features based on medical knowledge"""
-        enhanced_features = {}
-        
-        # Symptom count
-        enhanced_features['symptom_count'] = len(symptoms)
-        
-        # Symptom categories
-        skin_symptoms = ['itching', 'skin_rash', 'nodal_skin_eruptions', 'dischromic _patches', 
-                        'pus_filled_pimples', 'blackheads', 'scurring', 'skin_peeling', 
-                        'silver_like_dusting', 'blister', 'red_sore_around_nose', 'yellow_crust_ooze']
-        respiratory_symptoms = ['continuous_sneezing', 'cough', 'breathlessness', 'phlegm', 
-                               'throat_irritation', 'sinus_pressure', 'runny_nose', 'congestion']
-        gastrointestinal_symptoms = ['stomach_pain', 'vomiting', 'nausea', 'abdominal_pain', 
-                                    'diarrhoea', 'constipation', 'indigestion', 'loss_of_appetite']
-        neurological_symptoms = ['headache', 'dizziness', 'mood_swings', 'anxiety', 'depression', 
-                                'irritability', 'altered_sensorium', 'coma']
-        metabolic_symptoms = ['fatigue', 'weight_loss', 'weight_gain', 'irregular_sugar_level', 
-                             'excessive_hunger', 'polyuria', 'increased_appetite']
-        
-        enhanced_features['skin_symptoms_count'] = sum(1 for s in symptoms if s in skin_symptoms)
-        enhanced_features['respiratory_symptoms_count'] = sum(1 for s in symptoms if s in respiratory_symptoms)
-        enhanced_features['gastrointestinal_symptoms_count'] = sum(1 for s in symptoms if s in gastrointestinal_symptoms)
-        enhanced_features['neurological_symptoms_count'] = sum(1 for s in symptoms if s in neurological_symptoms)
-        enhanced_features['metabolic_symptoms_count'] = sum(1 for s in symptoms if s in metabolic_symptoms)
-        
-        # IMPROVED: Disease-specific symptom patterns with better differentiation
-        # Diabetes-specific features
-        diabetes_key_symptoms = ['fatigue', 'weight_loss', 'irregular_sugar_level', 'polyuria', 'increased_appetite']
-        diabetes_secondary_symptoms = ['excessive_hunger', 'blurred_and_distorted_vision', 'slow_healing_wounds']
-        enhanced_features['diabetes_symptom_score'] = sum(1 for s in symptoms if s in diabetes_key_symptoms)
-        enhanced_features['diabetes_secondary_score'] = sum(1 for s in symptoms if s in diabetes_secondary_symptoms)
-        
-        # Hyperthyroidism-specific features
-        hyperthyroidism_key_symptoms = ['fatigue', 'weight_loss', 'mood_swings', 'restlessness', 'sweating']
-        hyperthyroidism_secondary_symptoms = ['fast_heart_rate', 'palpitations', 'enlarged_thyroid', 'anxiety']
-        enhanced_features['hyperthyroidism_symptom_score'] = sum(1 for s in symptoms if s in hyperthyroidism_key_symptoms)
-        enhanced_features['hyperthyroidism_secondary_score'] = sum(1 for s in symptoms if s in hyperthyroidism_secondary_symptoms)
-        
-        # Typhoid-specific features
-        typhoid_key_symptoms = ['chills', 'vomiting', 'high_fever', 'toxic_look_(typhos)', 'abdominal_pain']
-        enhanced_features['typhoid_symptom_score'] = sum(1 for s in symptoms if s in typhoid_key_symptoms)
-        
-        # Fungal infection-specific features
-        fungal_key_symptoms = ['itching', 'skin_rash', 'nodal_skin_eruptions', 'dischromic _patches']
-        enhanced_features['fungal_symptom_score'] = sum(1 for s in symptoms if s in fungal_key_symptoms)
-        
-        # IMPROVED: Symptom combination features
-        # Diabetes vs Hyperthyroidism differentiation
-        if 'irregular_sugar_level' in symptoms or 'polyuria' in symptoms:
-            enhanced_features['diabetes_indicators'] = 1
-        else:
-            enhanced_features['diabetes_indicators'] = 0
-            
-        if 'mood_swings' in symptoms or 'sweating' in symptoms:
-            enhanced_features['hyperthyroidism_indicators'] = 1
-        else:
-            enhanced_features['hyperthyroidism_indicators'] = 0
-        
-        # IMPROVED: Weight loss context
-        enhanced_features['weight_loss_diabetes_context'] = 0
-        enhanced_features['weight_loss_hyperthyroidism_context'] = 0
-        enhanced_features['weight_loss_generic_context'] = 0
-        
-        if 'weight_loss' in symptoms:
-            if 'irregular_sugar_level' in symptoms or 'polyuria' in symptoms:
-                enhanced_features['weight_loss_diabetes_context'] = 1
-            elif 'mood_swings' in symptoms or 'sweating' in symptoms:
-                enhanced_features['weight_loss_hyperthyroidism_context'] = 1
-            else:
-                enhanced_features['weight_loss_generic_context'] = 1
-        
-        return enhanced_features
+        """Add enhanced features based on medical knowledge (see SYMPTOM_GROUPS)"""
+        row = encode_symptom_lists([symptoms])[0]
+        return dict(zip(ENHANCED_FEATURES, row[len(SYMPTOM_FEATURES):].tolist()))
     
     def train_models(self, enhanced_data):
         """Train multiple models for ensemble prediction"""
         print("Training improved enhanced models...")
         
         # Prepare features and labels
-        feature_names = list(enhanced_data[0]['features'].keys())
+        feature_names = enhanced_data['feature_names']
         self.feature_names = feature_names  # Set as instance attribute
-        X = np.array([[d['features'][f] for f in feature_names] for d in enhanced_data])
-        y = [d['disease'] for d in enhanced_data]
+        X = enhanced_data['features']
+        y = enhanced_data['diseases']
         
         # Encode labels
         y_encoded = self.label_encoder.fit_transform(y)
@@ -235,12 +236,11 @@ class ImprovedEnhancedMedicalPredictor:
                 self.feature_names = data['feature_names']
         
         # Create feature vector
-        feature_vector = self.create_feature_vector(symptoms)
-        enhanced_features = self.add_enhanced_features(symptoms, "unknown")
-        feature_vector.update(enhanced_features)
+        row = encode_symptom_lists([symptoms])
+        feature_vector = dict(zip(FEATURE_NAMES, row[0].tolist()))
         
-        # Prepare input
-        X = np.array([[feature_vector[f] for f in self.feature_names]])
+        # Prepare input (columns in the order the models were trained with)
+        X = row if self.feature_names == FEATURE_NAMES else row[:, [FEATURE_INDEX[f] for f in self.feature_names]]
         
         # Get predictions from all models
         predictions = {}
@@ -13,10 +13,11 @@ const bodyParser = require('body-parser');
 const fs = require('fs');
 
 const { loadTensorFlowModel, predict: mlPredict, ruleBasedPrediction } = require('./ml/predictor');
+const { updateDerivedFeatures } = require('./ml/features');
 const { config, store, csvSimulation, sensorGrouping, websocket, routes } = require('./modules');
 
 const { PORT, CSV_SIMULATION_PATH } = config;
-const { mergeSensors, pushHistory, setPrediction, getSensors, getHistory } = store;
+const { mergeSensors, pushHistory, setPrediction, getSensors } = store;
 
 const app = express();
 const server = http.createServer(app);
@@ -32,13 +33,15 @@ app.use(bodyParser.urlencoded({ extended: true }));
  */
 async function processGroupedSensorData(groupedData) {
   mergeSensors(groupedData);
+  // Every grouped reading updates its device's running flow_trend / zero_flow_seconds
+  const derived = updateDerivedFeatures(groupedData);
   pushHistory({ timestamp: new Date().toISOString(), time_window: groupedData.time_window });
   if (process.env.NODE_ENV !== 'production') {
     console.log(`[Grouped ${groupedData.time_window}] flow=${groupedData.flow_rate_Lmin?.toFixed(2)} cur=${groupedData.current_A?.toFixed(2)} -> ML`);
   }
 
   try {
-    const pred = await mlPredict(getSensors(), { history: getHistory(10) });
+    const pred = await mlPredict(getSensors(), { derived });
     setPrediction(pred);
   } catch (err) {
     console.error('ML predict error:', err.message);
@@ -15,6 +15,12 @@ const FEATURE_ORDER = [
   'health',
   'flow_trend',
   'zero_flow_seconds',
+  'vibration_rms_mean',
+  'vibration_rms_var',
+  'vibration_rms_rms',
+  'current_A_mean',
+  'current_A_var',
+  'current_A_rms',
   'divider_voltage',
   'sensor_distance_m',
 ];
@@ -35,15 +41,163 @@ function loadFeatureConfig() {
   return null;
 }
 
+// Derived features: Node port of RollingFeatures in rolling_features.py (training
+// uses its batch_features). Same definitions, same O(1) running sums, one state
+// per device that sees every grouped reading, so flow_trend and zero_flow_seconds
+// are not capped by a bounded history. python rolling_features.py checks parity.
+const TREND_WINDOW = 5;
+const TREND_CLIP = 2;
+const ZERO_FLOW_THRESHOLD = 0.01;
+const SAMPLE_PERIOD_S = 0.05; // seconds per reading when no time is given
+const STATS_WINDOW = TREND_WINDOW;
+const STATS_SIGNALS = ['vibration_rms', 'current_A'];
+const RESYNC = 256;
+
+/**
+ * Least-squares slope of y against j = 0..count-1 from s = sum(y), sjy = sum(j * y), clipped
+ */
+function trend(count, s, sjy) {
+  if (count < 2) return 0;
+  const sx = (count * (count - 1)) / 2;
+  const sxx = ((count - 1) * count * (2 * count - 1)) / 6;
+  const slope = (count * sjy - sx * s) / Math.max(count * sxx - sx * sx, 1);
+  return Math.max(-TREND_CLIP, Math.min(TREND_CLIP, slope));
+}
+
+/**
+ * mean, var, rms from sums of d = x - ref and d**2 (ref keeps the sums small)
+ */
+function stats(count, ref, sd, sdd) {
+  const meanD = sd / count;
+  const variance = Math.max(sdd / count - meanD * meanD, 0);
+  const mean = ref + meanD;
+  return [mean, variance, Math.sqrt(variance + mean * mean)];
+}
+
+class RollingFeatures {
+  constructor({
+    trendWindow = TREND_WINDOW,
+    statsWindow = STATS_WINDOW,
+    statsSignals = STATS_SIGNALS,
+    samplePeriod = SAMPLE_PERIOD_S,
+  } = {}) {
+    this.trendWindow = trendWindow;
+    this.statsWindow = statsWindow;
+    this.statsSignals = statsSignals;
+    this.samplePeriod = samplePeriod;
+    this.seen = 0;
+    this.tFirst = null;
+    this.tFlow = null;
+    this.flow = new Float64Array(trendWindow);
+    this.s = 0;
+    this.sjy = 0;
+    // per signal: ring buffer of x - ref, running sums of d and d**2
+    this.buffers = statsSignals.map(() => new Float64Array(statsWindow));
+    this.ref = new Float64Array(statsSignals.length);
+    this.sd = new Float64Array(statsSignals.length);
+    this.sdd = new Float64Array(statsSignals.length);
+  }
+
+  /**
+   * Add one reading (t in seconds, default seen * samplePeriod) and return
+   * { flow_trend, zero_flow_seconds, <signal>_mean, <signal>_var, <signal>_rms }
+   */
+  update(reading, t) {
+    let n = this.seen;
+    const time = t === undefined || t === null ? n * this.samplePeriod : Number(t);
+    const y = Number(reading.flow_rate_Lmin ?? 0);
+    const w = this.trendWindow;
+    if (n < w) {
+      this.sjy += n * y;
+      this.s += y;
+    } else {
+      const old = this.flow[n % w];
+      this.sjy = this.sjy - (this.s - old) + (w - 1) * y;
+      this.s += y - old;
+    }
+    this.flow[n % w] = y;
+
+    if (this.tFirst === null) this.tFirst = time;
+    const zero = Math.abs(y) < ZERO_FLOW_THRESHOLD;
+    if (!zero) this.tFlow = time;
+    const ref = this.tFlow === null ? this.tFirst - this.samplePeriod : this.tFlow;
+
+    const slot = n % this.statsWindow;
+    this.statsSignals.forEach((name, i) => {
+      const x = Number(reading[name] ?? 0);
+      if (n === 0) this.ref[i] = x;
+      const d = x - this.ref[i];
+      const old = n >= this.statsWindow ? this.buffers[i][slot] : 0;
+      this.sd[i] += d - old;
+      this.sdd[i] += d * d - old * old;
+      this.buffers[i][slot] = d;
+    });
+
+    this.seen = n = n + 1;
+    if (n % RESYNC === 0) this.resync();
+    const features = {
+      flow_trend: trend(Math.min(n, w), this.s, this.sjy),
+      zero_flow_seconds: zero ? time - ref : 0,
+    };
+    const count = Math.min(n, this.statsWindow);
+    this.statsSignals.forEach((name, i) => {
+      const [mean, variance, rms] = stats(count, this.ref[i], this.sd[i], this.sdd[i]);
+      features[`${name}_mean`] = mean;
+      features[`${name}_var`] = variance;
+      features[`${name}_rms`] = rms;
+    });
+    return features;
+  }
+
+  /** Recompute the running sums from the ring buffers (oldest first; unfilled slots are 0) */
+  resync() {
+    const w = this.trendWindow;
+    const start = this.seen >= w ? this.seen : 0;
+    let s = 0;
+    let sjy = 0;
+    for (let j = 0; j < Math.min(this.seen, w); j += 1) {
+      const y = this.flow[(start + j) % w];
+      s += y;
+      sjy += j * y;
+    }
+    this.s = s;
+    this.sjy = sjy;
+    this.buffers.forEach((buffer, i) => {
+      this.sd[i] = buffer.reduce((acc, d) => acc + d, 0);
+      this.sdd[i] = buffer.reduce((acc, d) => acc + d * d, 0);
+    });
+  }
+}
+
+const rollingStates = new Map(); // device_id -> RollingFeatures
+
+/**
+ * Fold one reading into its device's state (device_id, 'default' if missing).
+ * reading.timestamp (ms) is the reading time when present.
+ */
+function updateDerivedFeatures(reading) {
+  const deviceId = reading.device_id ?? 'default';
+  let state = rollingStates.get(deviceId);
+  if (!state) {
+    state = new RollingFeatures();
+    rollingStates.set(deviceId, state);
+  }
+  const ts = Number(reading.timestamp);
+  return state.update(reading, Number.isFinite(ts) ? ts / 1000 : undefined);
+}
+
+function resetDerivedFeatures(deviceId) {
+  if (deviceId === undefined) rollingStates.clear();
+  else rollingStates.delete(deviceId);
+}
+
 /**
  * Extract feature vector from sensor data (raw, not normalized)
- * Uses defaults for missing fields
+ * Uses defaults for missing fields. derived is this reading's
+ * updateDerivedFeatures() result (0 when omitted).
  */
 function extractFeatures(sensorData, options = {}) {
-  const {
-    history = [],
-    flowTrendWindow = 5,
-  } = options;
+  const { derived = {} } = options;
 
   const get = (key, def = 0) => {
     const v = sensorData[key];
@@ -60,19 +214,11 @@ function extractFeatures(sensorData, options = {}) {
   const divider_voltage = get('divider_voltage', 1.0);
   const sensor_distance_m = get('sensor_distance_m', 0);
 
-  // Derived: flow_trend from recent history
-  let flow_trend = 0;
-  if (history.length >= 2 && flowTrendWindow > 0) {
-    const recent = history.slice(-flowTrendWindow).map(h => h.flow_rate_Lmin ?? 0);
-    if (recent.length >= 2) {
-      const first = recent[0];
-      const last = recent[recent.length - 1];
-      flow_trend = Math.max(-2, Math.min(2, (last - first) / (recent.length || 1)));
-    }
-  }
-
-  // Derived: zero_flow_seconds (when flow near zero)
-  const zero_flow_seconds = Math.abs(flow_rate_Lmin) < 0.01 ? 1 : 0;
+  // Derived (RollingFeatures); without them, the stats of this reading alone
+  const flow_trend = derived.flow_trend ?? 0;
+  const zero_flow_seconds = derived.zero_flow_seconds ?? 0;
+  const single = { mean: (x) => x, var: () => 0, rms: (x) => Math.abs(x) };
+  const rolling = (name, stat) => derived[`${name}_${stat}`] ?? single[stat](get(name, 0));
 
   return [
     current_A,
@@ -83,6 +229,12 @@ function extractFeatures(sensorData, options = {}) {
     health,
     flow_trend,
     zero_flow_seconds,
+    rolling('vibration_rms', 'mean'),
+    rolling('vibration_rms', 'var'),
+    rolling('vibration_rms', 'rms'),
+    rolling('current_A', 'mean'),
+    rolling('current_A', 'var'),
+    rolling('current_A', 'rms'),
     divider_voltage,
     sensor_distance_m,
   ];
@@ -103,17 +255,36 @@ function normalizeFeatures(features, cfg) {
 /**
  * Build model input: extract -> normalize
  */
-function buildModelInput(sensorData, history = []) {
+function buildModelInput(sensorData, derived = {}) {
   const cfg = loadFeatureConfig();
-  const raw = extractFeatures(sensorData, { history });
+  const raw = extractFeatures(sensorData, { derived });
   const normalized = normalizeFeatures(raw, cfg);
   return normalized;
 }
 
 module.exports = {
   FEATURE_ORDER,
+  RollingFeatures,
+  updateDerivedFeatures,
+  resetDerivedFeatures,
   extractFeatures,
   normalizeFeatures,
   buildModelInput,
   loadFeatureConfig,
 };
+
+// node features.js < {"flow_rate_Lmin": [...], "vibration_rms": [...], ..., "time": [...]}
+// -> derived features per reading as JSON columns (the parity check in rolling_features.py)
+if (require.main === module) {
+  const { time, ...columns } = JSON.parse(fs.readFileSync(0, 'utf8'));
+  const names = Object.keys(columns);
+  const engine = new RollingFeatures();
+  const out = {};
+  columns.flow_rate_Lmin.forEach((_, i) => {
+    const reading = {};
+    names.forEach((name) => { reading[name] = columns[name][i]; });
+    const features = engine.update(reading, time ? time[i] : undefined);
+    Object.entries(features).forEach(([name, value]) => { (out[name] ??= []).push(value); });
+  });
+  process.stdout.write(JSON.stringify(out));
+}
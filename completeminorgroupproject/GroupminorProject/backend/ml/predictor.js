@@ -3,7 +3,14 @@
  * Runs in main Node.js backend; no Python API needed.
  *
  * Model features (train_aiml.py): current, temperature, vibration, flow,
- * pump_runtime, health, flow_trend, zero_flow_seconds, divider_voltage, sensor_distance_m
+ * pump_runtime, health, flow_trend, zero_flow_seconds, rolling mean/var/RMS of
+ * vibration and current, divider_voltage, sensor_distance_m
+ *
+ * Models trained before FEATURE_CODE_VERSION 3 are stale: version 1 had
+ * zero_flow_seconds as a 0/1 zero-flow flag and flow_trend as a one-step
+ * difference, and version 3 added the rolling stats, so their inputs do not
+ * match the features served now. Retrain (steps below); loadTensorFlowModel()
+ * warns when feature_config.json is older.
  *
  * To deploy:
  *   1. python backend/ml/train_aiml.py --dataset pump_dataset_generator/LEVEL1_LEVEL2_PUMP_DATASET_IMPROVED.csv
@@ -13,12 +20,13 @@
 
 const path = require('path');
 const fs = require('fs');
-const { buildModelInput } = require('./features');
+const { buildModelInput, loadFeatureConfig } = require('./features');
 
 let tf = null;
 let tfModel = null;
 const MODEL_DIR = path.join(__dirname, 'models');
 const CONDITION_LABELS = ['Normal', 'Leakage Detected', 'Blockage Suspected', 'Failure Risk High'];
+const FEATURE_CODE_VERSION = 3; // train_aiml.py
 
 async function loadTensorFlowModel() {
   if (tf !== null) return tfModel !== null;
@@ -34,6 +42,11 @@ async function loadTensorFlowModel() {
     if (fs.existsSync(modelPath)) {
       tfModel = await tf.loadLayersModel(`file://${modelPath}`);
       console.log('✓ TensorFlow.js model loaded from', MODEL_DIR);
+      const cfg = loadFeatureConfig();
+      if (!cfg || (cfg.feature_code_version ?? 1) < FEATURE_CODE_VERSION) {
+        console.warn('TF.js model predates feature code version', FEATURE_CODE_VERSION,
+          '(different derived features) - retrain with train_aiml.py');
+      }
       return true;
     }
   } catch (e) {
@@ -123,14 +136,14 @@ function ruleBasedPrediction(sensorData) {
 /**
  * Predict using TensorFlow.js model if loaded, else rule-based
  * @param {Object} sensorData - Sensor readings
- * @param {Object} options - { history: [] } for flow_trend derivation
+ * @param {Object} options - { derived } from updateDerivedFeatures() (flow_trend, zero_flow_seconds, rolling stats)
  */
 async function predict(sensorData, options = {}) {
-  const { history = [] } = options;
+  const { derived = {} } = options;
   const useTf = tfModel && tf && typeof tf.tensor2d === 'function';
   if (useTf) {
     try {
-      const features = buildModelInput(sensorData, history);
+      const features = buildModelInput(sensorData, derived);
       const input = tf.tensor2d([features]);
       const pred = tfModel.predict(input);
       const predData = await pred.data();
@@ -0,0 +1,231 @@
+"""
+Rolling derived features with O(1) state per reading
+
+One set of definitions for training (batch_features, vectorized over a whole
+series) and per-reading scoring (RollingFeatures.update):
+
+  flow_trend          least-squares slope of flow over the last TREND_WINDOW
+                      readings (per reading), clipped to +-TREND_CLIP
+  zero_flow_seconds   time since the last reading with |flow| >= ZERO_FLOW_THRESHOLD
+                      (0 while there is flow)
+  <signal>_mean/_var/_rms   over the last STATS_WINDOW readings, per STATS_SIGNALS
+
+The streaming path keeps running sums over ring buffers (recomputed from the
+buffers every RESYNC readings, so rounding cannot drift); the batch path uses
+sliding-window sums. Both finish through the same _trend / _stats functions
+and agree to float64 rounding. backend/ml/features.js (RollingFeatures) is the Node
+port of the streaming path that serving uses, one state per device;
+python rolling_features.py checks all three on the same stream.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+TREND_WINDOW = 5          # readings (TREND_WINDOW in features.js)
+TREND_CLIP = 2.0
+ZERO_FLOW_THRESHOLD = 0.01
+SAMPLE_PERIOD = 0.05      # seconds per reading when no time is given (pump dataset rate)
+STATS_WINDOW = TREND_WINDOW  # readings (STATS_WINDOW in features.js)
+STATS_SIGNALS = ('vibration_rms', 'current_A')
+RESYNC = 256
+FEATURES_JS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'features.js')
+
+
+def _trend(count, s, sjy):
+    """Slope of y against j = 0..count-1 from s = sum(y), sjy = sum(j * y)."""
+    sx = count * (count - 1) / 2
+    sxx = (count - 1) * count * (2 * count - 1) / 6
+    den = count * sxx - sx * sx
+    slope = (count * sjy - sx * s) / np.maximum(den, 1)
+    return np.clip(slope, -TREND_CLIP, TREND_CLIP) * (count >= 2)
+
+
+def _stats(count, ref, sd, sdd):
+    """mean, var, rms from sums of d = x - ref and d**2 (ref keeps the sums small)."""
+    mean_d = sd / count
+    var = np.maximum(sdd / count - mean_d * mean_d, 0.0)
+    mean = ref + mean_d
+    return mean, var, np.sqrt(var + mean * mean)
+
+
+def feature_names(stats_signals=STATS_SIGNALS):
+    return ['flow_trend', 'zero_flow_seconds'] + [
+        f'{signal}_{stat}' for signal in stats_signals for stat in ('mean', 'var', 'rms')]
+
+
+class RollingFeatures:
+    """Per-stream state; update() takes one reading and returns its features."""
+
+    def __init__(self, trend_window=TREND_WINDOW, stats_window=STATS_WINDOW,
+                 stats_signals=STATS_SIGNALS, sample_period=SAMPLE_PERIOD):
+        self.trend_window, self.stats_window = trend_window, stats_window
+        self.stats_signals = tuple(stats_signals)
+        self.sample_period = sample_period
+        self.seen = 0
+        self.t_first = self.t_flow = None
+        self.flow = np.zeros(trend_window)
+        self.s = self.sjy = 0.0
+        k = len(self.stats_signals)
+        self.buffers = np.zeros((k, stats_window))  # x - ref, oldest overwritten first
+        self.ref, self.sd, self.sdd = np.zeros(k), np.zeros(k), np.zeros(k)
+
+    def update(self, reading, t=None):
+        n = self.seen
+        t = n * self.sample_period if t is None else float(t)
+        y = float(reading.get('flow_rate_Lmin', 0.0))
+        w = self.trend_window
+        if n < w:
+            self.sjy += n * y
+            self.s += y
+        else:
+            old = self.flow[n % w]
+            self.sjy = self.sjy - (self.s - old) + (w - 1) * y
+            self.s += y - old
+        self.flow[n % w] = y
+
+        if self.t_first is None:
+            self.t_first = t
+        zero = abs(y) < ZERO_FLOW_THRESHOLD
+        if not zero:
+            self.t_flow = t
+        ref = self.t_first - self.sample_period if self.t_flow is None else self.t_flow
+
+        x = np.array([float(reading.get(name, 0.0)) for name in self.stats_signals])
+        if n == 0:
+            self.ref = x.copy()
+        slot = n % self.stats_window
+        d = x - self.ref
+        old = self.buffers[:, slot] if n >= self.stats_window else 0.0
+        self.sd += d - old
+        self.sdd += d * d - old * old
+        self.buffers[:, slot] = d
+
+        self.seen = n = n + 1
+        if n % RESYNC == 0:
+            self._resync()
+        features = {'flow_trend': float(_trend(min(n, w), self.s, self.sjy)),
+                    'zero_flow_seconds': t - ref if zero else 0.0}
+        mean, var, rms = _stats(min(n, self.stats_window), self.ref, self.sd, self.sdd)
+        for i, name in enumerate(self.stats_signals):
+            features[f'{name}_mean'] = float(mean[i])
+            features[f'{name}_var'] = float(var[i])
+            features[f'{name}_rms'] = float(rms[i])
+        return features
+
+    def _resync(self):
+        """Recompute the running sums from the ring buffers (oldest first; unfilled slots are 0)."""
+        s = sjy = 0.0
+        w, n = self.trend_window, self.seen
+        start = n if n >= w else 0
+        for j in range(min(n, w)):
+            y = float(self.flow[(start + j) % w])
+            s += y
+            sjy += j * y
+        self.s, self.sjy = s, sjy
+        self.sd = self.buffers.sum(axis=1)
+        self.sdd = (self.buffers * self.buffers).sum(axis=1)
+
+
+def _window(x, w):
+    """(n, w) view: row t holds x[t-w+1 .. t], zero-padded before the start."""
+    return sliding_window_view(np.concatenate([np.zeros(w - 1), x]), w)
+
+
+def batch_features(columns, time=None, trend_window=TREND_WINDOW, stats_window=STATS_WINDOW,
+                   stats_signals=STATS_SIGNALS, sample_period=SAMPLE_PERIOD):
+    """Features for every reading of one stream; columns maps name -> 1-D array (a DataFrame works)."""
+    flow = np.asarray(columns['flow_rate_Lmin'], dtype=np.float64)
+    n = len(flow)
+    idx = np.arange(n)
+    t = idx * sample_period if time is None else np.asarray(time, dtype=np.float64)
+    out = {}
+
+    count = np.minimum(idx + 1, trend_window).astype(np.float64)
+    view = _window(flow, trend_window)
+    s = view.sum(axis=1)
+    # j is relative to the padded window; shift it so the oldest real reading has j = 0
+    sjy = view @ np.arange(trend_window, dtype=np.float64) - (trend_window - count) * s
+    out['flow_trend'] = _trend(count, s, sjy)
+
+    zero = np.abs(flow) < ZERO_FLOW_THRESHOLD
+    last_flow = np.maximum.accumulate(np.where(zero, -1, idx)) if n else idx
+    ref = np.where(last_flow >= 0, t[np.maximum(last_flow, 0)], t[0] - sample_period if n else 0.0)
+    out['zero_flow_seconds'] = np.where(zero, t - ref, 0.0)
+
+    count = np.minimum(idx + 1, stats_window).astype(np.float64)
+    for name in stats_signals:
+        x = np.asarray(columns[name], dtype=np.float64) if name in columns else np.zeros(n)
+        ref = x[0] if n else 0.0
+        d = x - ref
+        sd = _window(d, stats_window).sum(axis=1)
+        sdd = _window(d * d, stats_window).sum(axis=1)
+        out[f'{name}_mean'], out[f'{name}_var'], out[f'{name}_rms'] = _stats(count, ref, sd, sdd)
+    return out
+
+
+def node_features(columns, t):
+    """Run features.js (RollingFeatures, as served) over one stream; None when node is not installed."""
+    node = shutil.which('node')
+    if node is None:
+        return None
+    stream = {name: np.asarray(values).tolist() for name, values in columns.items()}
+    stream['time'] = np.asarray(t).tolist()
+    stream = json.dumps(stream)
+    out = subprocess.run([node, FEATURES_JS], input=stream, capture_output=True, text=True, check=True)
+    return {name: np.asarray(values, dtype=np.float64) for name, values in json.loads(out.stdout).items()}
+
+
+def verify(n=20000, seed=0, tolerance=1e-9):
+    """
+    Max abs difference per feature of the streaming (Python) and Node paths
+    against batch_features on one random stream with a 200-reading zero-flow
+    run; raises AssertionError above tolerance. The Node entry is None when
+    node is not installed.
+    """
+    rng = np.random.default_rng(seed)
+    flow = np.abs(rng.normal(8, 3, n)) * (rng.random(n) > 0.1)
+    flow[n // 3: n // 3 + 200] = 0.0
+    columns = {'flow_rate_Lmin': flow,
+               'vibration_rms': rng.gamma(2.0, 0.4, n),
+               'current_A': rng.normal(5.0, 0.2, n)}
+    t = np.cumsum(rng.uniform(0.04, 0.06, n))
+    batch = batch_features(columns, t)
+    engine = RollingFeatures()
+    stream = {name: np.empty(n) for name in batch}
+    for i in range(n):
+        for name, value in engine.update({k: v[i] for k, v in columns.items()}, t[i]).items():
+            stream[name][i] = value
+    paths = {'stream': stream, 'node': node_features(columns, t)}
+    diffs = {}
+    for path, out in paths.items():
+        for name in batch:
+            diff = None if out is None else float(np.max(np.abs(out[name] - batch[name])))
+            assert diff is None or diff <= tolerance, f"{path} {name}: {diff:.2e} > {tolerance:.0e}"
+            diffs[(path, name)] = diff
+    return diffs
+
+
+if __name__ == '__main__':
+    for (path, name), diff in verify().items():
+        if diff is None:
+            print(f"{name:22s} {path}: skipped (node not found)")
+        else:
+            print(f"{name:22s} max |{path} - batch| = {diff:.2e}")
+    n = 1_000_000
+    rng = np.random.default_rng(1)
+    columns = {'flow_rate_Lmin': rng.normal(8, 3, n), 'vibration_rms': rng.random(n), 'current_A': rng.random(n)}
+    start = time.perf_counter()
+    batch_features(columns)
+    print(f"batch: {n / (time.perf_counter() - start) / 1e6:.1f}M readings/s")
+    engine = RollingFeatures()
+    reading = {k: 1.0 for k in columns}
+    start = time.perf_counter()
+    for _ in range(20000):
+        engine.update(reading)
+    print(f"stream: {(time.perf_counter() - start) / 20000 * 1e6:.1f} us/reading")
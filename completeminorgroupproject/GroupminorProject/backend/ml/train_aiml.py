@@ -9,8 +9,9 @@ Features (aligned with pump dataset + flow metrics):
   - flow (L/min)
   - time / pump_runtime (min)
   - health (current health %)
-  - flow_trend (derived: slope over window)
-  - zero_flow_seconds (derived)
+  - flow_trend (derived: slope over the last readings, rolling_features.py)
+  - zero_flow_seconds (derived: length of the current zero-flow run, rolling_features.py)
+  - vibration_rms / current_A rolling mean, variance, RMS (derived, rolling_features.py)
   - total_volume_L (optional, 0 if unavailable)
   - sensor_distance_m (optional, 0 = default)
   - tube_type_* (optional one-hot: rubber, pvc, etc.)
@@ -19,11 +20,23 @@ Output: 4 classes — Normal (0), Leakage (1), Blockage (2), Failure Risk (3)
 
 Usage:
   python train_aiml.py [--dataset path/to/dataset.csv] [--output-dir backend/ml/models]
+
+--dataset may also be a columnar dataset directory (*.cols, from
+generate_level12_dataset.py --format columnar); only the needed columns are
+memory-mapped, nothing is parsed.
+
+The prepared feature matrix (scaled) and scaler stats are cached under
+--cache-dir, keyed by a sha256 of the dataset contents and
+FEATURE_CODE_VERSION, and memory-mapped on later runs. Bump
+FEATURE_CODE_VERSION when load_and_prepare_dataset / build_feature_matrix /
+FEATURE_ORDER change. --no-cache rebuilds without reading or writing it.
 """
 
 import argparse
+import hashlib
 import json
 import os
+import shutil
 import sys
 
 import numpy as np
@@ -32,6 +45,8 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 
+from rolling_features import STATS_SIGNALS, batch_features, feature_names
+
 try:
     import tensorflow as tf
     from tensorflow.keras.models import Sequential
@@ -43,6 +58,7 @@ except ImportError:
     sys.exit(1)
 
 RANDOM_STATE = 42
+FEATURE_CODE_VERSION = 3  # part of the feature cache key
 NUM_CLASSES = 4  # Normal, Leakage, Blockage, Failure Risk
 
 # Feature order for inference (must match predictor.js)
@@ -55,6 +71,12 @@ FEATURE_ORDER = [
     'health',
     'flow_trend',
     'zero_flow_seconds',
+    'vibration_rms_mean',
+    'vibration_rms_var',
+    'vibration_rms_rms',
+    'current_A_mean',
+    'current_A_var',
+    'current_A_rms',
     'divider_voltage',
     'sensor_distance_m',
 ]
@@ -62,9 +84,32 @@ FEATURE_ORDER = [
 CONDITION_LABELS = ['Normal', 'Leakage Detected', 'Blockage Suspected', 'Failure Risk High']
 
 
+DATASET_COLUMNS = ['pump_id', 'time', 'current', 'temperature', 'vibration', 'flow', 'health', 'label']
+
+
+def read_columnar(path, columns):
+    """DataFrame of the requested columns of a columnar dataset (meta.json + one .bin per column)."""
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    # Same check as pump_dataset_generator/columnar.py: a failed run leaves complete=false
+    if not meta.get('complete', True):
+        raise ValueError(path + ' is incomplete (the writer was not closed, or the run failed)')
+    data = {}
+    for name in columns:
+        info = meta['columns'].get(name)
+        if info is None:
+            continue
+        data[name] = np.memmap(os.path.join(path, info['file']), dtype=np.dtype(info['dtype']),
+                               mode='r', shape=(meta['rows'],))
+    return pd.DataFrame(data)
+
+
 def load_and_prepare_dataset(filepath):
     """Load pump dataset and map to standard column names."""
-    df = pd.read_csv(filepath)
+    if os.path.isdir(filepath):
+        df = read_columnar(filepath, DATASET_COLUMNS)
+    else:
+        df = pd.read_csv(filepath)
     # Map pump dataset columns
     col_map = {
         'current': 'current_A',
@@ -75,7 +120,7 @@ def load_and_prepare_dataset(filepath):
     df = df.rename(columns=col_map)
 
     # Ensure label is 0-3; add synthetic Failure Risk (3) if missing
-    labels = df['label'].values
+    labels = df['label'].values.copy()  # .values can be read-only (copy-on-write / memmap)
     if 3 not in np.unique(labels):
         # Add synthetic samples: high vibration + high temp -> Failure Risk
         mask = (df['vibration_rms'] > 2.0) | (df['temperature_C'] > 60)
@@ -88,8 +133,7 @@ def load_and_prepare_dataset(filepath):
 
     # Derived features
     df['pump_runtime_min'] = df.get('time', pd.Series(0, index=df.index)) / 60.0
-    df['flow_trend'] = df['flow_rate_Lmin'].diff().fillna(0).clip(-2, 2)  # bounded slope
-    df['zero_flow_seconds'] = (df['flow_rate_Lmin'].abs() < 0.01).astype(float)  # simplified
+    add_rolling_features(df)
     df['divider_voltage'] = 1.0  # placeholder
     df['sensor_distance_m'] = 0.0  # placeholder for future
 
@@ -98,6 +142,23 @@ def load_and_prepare_dataset(filepath):
     return df
 
 
+def add_rolling_features(df):
+    """Derived features from rolling_features.py, one stream per pump in fleet datasets."""
+    edges = [0, len(df)]
+    if 'pump_id' in df.columns:
+        edges = [0] + (np.flatnonzero(np.diff(df['pump_id'].values)) + 1).tolist() + [len(df)]
+    columns = {name: df[name].values for name in ('flow_rate_Lmin',) + STATS_SIGNALS}
+    time = df['time'].values if 'time' in df.columns else None
+    parts = {name: [] for name in feature_names()}
+    for start, stop in zip(edges[:-1], edges[1:]):
+        out = batch_features({name: values[start:stop] for name, values in columns.items()},
+                             None if time is None else time[start:stop])
+        for name in parts:
+            parts[name].append(out[name])
+    for name, values in parts.items():
+        df[name] = np.concatenate(values)
+
+
 def build_feature_matrix(df):
     """Build X and y from dataframe."""
     available = [f for f in FEATURE_ORDER if f in df.columns]
@@ -110,6 +171,53 @@ def build_feature_matrix(df):
     return X, y
 
 
+def dataset_digest(path):
+    """sha256 of a dataset's contents: the CSV bytes, or meta.json + the used column files of a .cols dir."""
+    h = hashlib.sha256()
+    if os.path.isdir(path):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        columns = meta['columns']
+        files = [os.path.join(path, 'meta.json')] + [
+            os.path.join(path, columns[name]['file']) for name in DATASET_COLUMNS if name in columns]
+    else:
+        files = [path]
+    for name in files:
+        with open(name, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+    return h.hexdigest()
+
+
+def prepare_features(filepath):
+    """Scaled X (float32), y and scaler stats (mean, scale) for a dataset."""
+    X, y = build_feature_matrix(load_and_prepare_dataset(filepath))
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X).astype(np.float32)
+    return X_scaled, y, scaler.mean_, scaler.scale_
+
+
+def cached_features(filepath, cache_dir):
+    """prepare_features() through a content-addressed on-disk cache (arrays memory-mapped on a hit)."""
+    key = hashlib.sha256(f"{FEATURE_CODE_VERSION}:{','.join(FEATURE_ORDER)}:{dataset_digest(filepath)}"
+                         .encode()).hexdigest()[:16]
+    path = os.path.join(cache_dir, key)
+    names = ('X', 'y', 'scaler_mean', 'scaler_scale')
+    if os.path.isdir(path):
+        arrays = [np.load(os.path.join(path, n + '.npy'), mmap_mode='r') for n in names]
+        print(f"Dataset: {len(arrays[1])} rows (feature cache {path})")
+        return arrays
+    arrays = prepare_features(filepath)
+    tmp = path + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, array in zip(names, arrays):
+        np.save(os.path.join(tmp, name + '.npy'), array)
+    os.replace(tmp, path)
+    print(f"Cached features: {path}")
+    return arrays
+
+
 def build_model(input_dim, num_classes=4):
     """Dense classifier for condition prediction."""
     model = Sequential([
@@ -134,10 +242,12 @@ def build_model(input_dim, num_classes=4):
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--dataset', default='../../pump_dataset_generator/LEVEL1_LEVEL2_PUMP_DATASET_IMPROVED.csv',
-                        help='Path to pump CSV (relative to script dir)')
+                        help='Path to pump CSV or .cols directory (relative to script dir)')
     parser.add_argument('--output-dir', default=None, help='Output dir (default: same as script)')
     parser.add_argument('--epochs', type=int, default=50)
     parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--cache-dir', default=None, help='Feature cache dir (default: .feature_cache next to the script)')
+    parser.add_argument('--no-cache', action='store_true', help='Prepare features without the cache')
     args = parser.parse_args()
 
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -149,11 +259,12 @@ def main():
     print("AIML Model Training (TensorFlow.js)")
     print("=" * 50)
 
-    df = load_and_prepare_dataset(dataset_path)
-    X, y = build_feature_matrix(df)
-
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
+    if args.no_cache:
+        X_scaled, y, scaler_mean, scaler_scale = prepare_features(dataset_path)
+    else:
+        cache_dir = args.cache_dir or os.path.join(script_dir, '.feature_cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        X_scaled, y, scaler_mean, scaler_scale = cached_features(dataset_path, cache_dir)
 
     X_train, X_temp, y_train, y_temp = train_test_split(
         X_scaled, y, test_size=0.25, random_state=RANDOM_STATE, stratify=y
@@ -194,10 +305,11 @@ def main():
     # Save feature config (scaler params + feature order) for predictor
     config = {
         'feature_order': FEATURE_ORDER,
+        'feature_code_version': FEATURE_CODE_VERSION,
         'condition_labels': CONDITION_LABELS,
         'num_classes': NUM_CLASSES,
-        'scaler_mean': scaler.mean_.tolist(),
-        'scaler_scale': scaler.scale_.tolist(),
+        'scaler_mean': np.asarray(scaler_mean).tolist(),
+        'scaler_scale': np.asarray(scaler_scale).tolist(),
         'test_accuracy': float(acc),
     }
     config_path = os.path.join(output_dir, 'feature_config.json')
@@ -210,6 +322,8 @@ def main():
     print("  pip install tensorflowjs")
     print(f"  tensorflowjs_converter --input_format keras {h5_path} {output_dir}")
     print("  (Then delete aiml_model.h5 if desired; keep model.json and *.bin)")
+    print("Export for the Python NumPy runtime (no TensorFlow at serve time):")
+    print(f"  python ml-models/export_numpy.py {h5_path}")
     print("=" * 50)
 
 
@@ -12,38 +12,87 @@ This server is kept for:
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import os
+import threading
+import time
 
-try:
-    from predict import IrrigationPredictor
-except Exception:
-    IrrigationPredictor = None
+from pump_client import PumpHealthClient
 
 app = Flask(__name__)
 CORS(app)
 
 # Pump Health API (pump_dataset_generator) - port 5003; trained on LEVEL1_LEVEL2_PUMP_DATASET_IMPROVED
 PUMP_API_URL = os.environ.get("PUMP_API_URL", "http://localhost:5003")
+PUMP_API_BATCH_TIMEOUT = float(os.environ.get("PUMP_API_BATCH_TIMEOUT", 10))
+pump_client = PumpHealthClient(
+    PUMP_API_URL,
+    timeout=float(os.environ.get("PUMP_API_TIMEOUT", 0.5)),
+    failure_threshold=int(os.environ.get("PUMP_API_FAILURES", 3)),
+    reset_timeout=float(os.environ.get("PUMP_API_RESET_S", 10)),
+)
 
-# Initialize predictor
+# Predictor is loaded in the background; rule-based fallback serves until it is ready
 predictor = None
-try:
-    if IrrigationPredictor:
-        model_dir = os.path.join(os.path.dirname(__file__), 'models')
-        predictor = IrrigationPredictor(model_dir=model_dir)
+model_status = {'status': 'not_loaded', 'error': None, 'load_seconds': None}
+_load_lock = threading.Lock()
+
+WARMUP_READING = {
+    'vibration_rms': 0.5, 'temperature_C': 35.0, 'current_A': 2.0,
+    'flow_rate_Lmin': 5.0, 'tank_level_cm': 50.0, 'ph_value': 7.0,
+    'turbidity_NTU': 10.0, 'pump_runtime_min': 10
+}
+
+def load_models():
+    """Load models once (thread-safe) and warm up every inference path"""
+    global predictor
+    with _load_lock:
+        if model_status['status'] != 'not_loaded':
+            return predictor
+        model_status['status'] = 'loading'
+        start = time.perf_counter()
+        try:
+            from predict import IrrigationPredictor
+            model_dir = os.path.join(os.path.dirname(__file__), 'models')
+            loaded = IrrigationPredictor(model_dir=model_dir)
+            # Warm-up on synthetic input, then forget it
+            loaded.predict(WARMUP_READING)
+            loaded.predict_batch([WARMUP_READING] * (2 * loaded.sequence_length))
+            loaded.sequence_buffer = []
+        except Exception as e:
+            model_status.update(status='failed', error=str(e))
+            print(f"⚠ Error loading ML models: {e}")
+            print("  Using rule-based fallback")
+            return None
+        predictor = loaded
+        model_status.update(status='ready', load_seconds=round(time.perf_counter() - start, 3))
         print("✓ ML models loaded successfully")
-except Exception as e:
-    print(f"⚠ Error loading ML models: {e}")
-    print("  Using rule-based fallback")
-    predictor = None
+    return predictor
+
+def load_models_async():
+    """Start loading in a background thread (no-op if already started)"""
+    if model_status['status'] == 'not_loaded':
+        threading.Thread(target=load_models, name='ml-model-load', daemon=True).start()
+
+load_models_async()
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
     return jsonify({
         'status': 'running',
-        'ml_models_loaded': predictor is not None
+        'ml_models_loaded': predictor is not None,
+        'model_status': model_status
     })
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Pump Health API fan-out metrics: calls, failures, circuit state, winning source"""
+    return jsonify(pump_client.stats())
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe: 200 once models are loaded and warmed up, else 503"""
+    return jsonify(model_status), (200 if predictor is not None else 503)
+
 @app.route('/predict', methods=['POST'])
 def predict():
     """Predict endpoint - receives sensor data, returns predictions.
@@ -54,6 +103,9 @@ def predict():
         if not sensor_data:
             return jsonify({'error': 'No sensor data provided'}), 400
         
+        # Pump Health API call runs while the local model predicts
+        pump_future = pump_client.submit(sensor_data)
+        
         # Base prediction from ML or rule-based
         if predictor:
             result = predictor.predict(sensor_data)
@@ -61,27 +113,66 @@ def predict():
             result = rule_based_prediction(sensor_data)
         
         # Prefer Pump Health API (new AI, improved dataset) when available
-        try:
-            import requests
-            r = requests.post(f"{PUMP_API_URL}/predict", json=sensor_data, timeout=3)
-            if r.ok:
-                pump = r.json()
-                if pump.get("condition") and pump.get("condition") not in ("Collecting data...", "Model not loaded"):
-                    result["condition"] = pump.get("condition")
-                    result["health_score"] = pump.get("health_score", result.get("health_score"))
-                    result["pump_health_class"] = pump.get("condition")
-                    result["prediction_source"] = "pump_ai"
-                    if pump.get("recommendation"):
-                        result["recommendations"] = [pump["recommendation"]]
-                    return jsonify(result)
-        except Exception:
-            pass
+        pump = pump_client.result(pump_future)
+        if pump:
+            merge_pump_result(result, pump)
+        pump_client.record_source(result.get('prediction_source'))
 
         return jsonify(result)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    """Batch endpoint - receives many readings, returns one prediction per reading.
+    Body: a JSON list of readings, {"readings": [...]}, or {"columns": {name: [values]}}."""
+    try:
+        body = request.json
+        if isinstance(body, dict):
+            readings = body.get('columns') or body.get('readings')
+        else:
+            readings = body
+        
+        if not readings:
+            return jsonify({'error': 'No sensor data provided'}), 400
+        
+        rows = readings
+        if isinstance(readings, dict):
+            names = list(readings.keys())
+            rows = [dict(zip(names, values)) for values in zip(*readings.values())]
+        
+        # Pump Health API accepts a list and scores it in one GRU pass (runs concurrently)
+        pump_future = pump_client.submit(rows, timeout=PUMP_API_BATCH_TIMEOUT)
+        
+        if predictor:
+            results = predictor.predict_batch(readings)
+        else:
+            results = [rule_based_prediction(r) for r in rows]
+        
+        pumps = pump_client.result(pump_future, timeout=PUMP_API_BATCH_TIMEOUT)
+        if isinstance(pumps, list):
+            for result, pump in zip(results, pumps):
+                merge_pump_result(result, pump)
+        for result in results:
+            pump_client.record_source(result.get('prediction_source'))
+        
+        return jsonify({'count': len(results), 'predictions': results})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def merge_pump_result(result, pump):
+    """Use Pump Health API condition/health_score when it has a real prediction"""
+    if pump.get("condition") and pump.get("condition") not in ("Collecting data...", "Model not loaded", "Model loading..."):
+        result["condition"] = pump.get("condition")
+        result["health_score"] = pump.get("health_score", result.get("health_score"))
+        result["pump_health_class"] = pump.get("condition")
+        result["prediction_source"] = "pump_ai"
+        if pump.get("recommendation"):
+            result["recommendations"] = [pump["recommendation"]]
+    return result
+
 def rule_based_prediction(sensor_data):
     """Fallback rule-based prediction when ML models not available"""
     vibration = sensor_data.get('vibration_rms', 0)
@@ -158,4 +249,5 @@ if __name__ == '__main__':
     print("Python ML API (optional - main backend uses TensorFlow.js)")
     print("=" * 50)
     print(f"Starting on port {port}")
-    app.run(host='0.0.0.0', port=port, debug=True)
+    # Debug mode (reloader + debugger) only on request; for concurrency use asgi_server.py
+    app.run(host='0.0.0.0', port=port, debug=os.environ.get('FLASK_DEBUG') == '1', threaded=True)
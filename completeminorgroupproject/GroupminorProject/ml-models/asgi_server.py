@@ -0,0 +1,179 @@
+"""
+Async (ASGI) serving mode for the Python ML API - same routes as api_server.py
+
+I/O (requests, Pump Health API fan-out via httpx) stays on the event loop;
+model inference runs on a bounded thread pool so it never blocks the loop.
+
+Run:
+  pip install -r requirements_async.txt
+  python asgi_server.py            # or: uvicorn asgi_server:app --port 5001
+
+Env:
+  ML_INFER_WORKERS  inference threads (default 1: the LSTM sequence buffer is shared state)
+  ML_INFER_QUEUE    max requests waiting for inference before 503 (default 256)
+"""
+
+import asyncio
+import contextlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import api_server
+from api_server import (
+    rule_based_prediction, merge_pump_result, model_status,
+    PUMP_API_URL, PUMP_API_BATCH_TIMEOUT,
+)
+from pump_client import AsyncPumpHealthClient
+
+INFER_WORKERS = int(os.environ.get('ML_INFER_WORKERS', 1))
+INFER_QUEUE = int(os.environ.get('ML_INFER_QUEUE', 256))
+
+executor = ThreadPoolExecutor(max_workers=INFER_WORKERS, thread_name_prefix='ml-infer')
+pump_client = AsyncPumpHealthClient(
+    PUMP_API_URL,
+    timeout=float(os.environ.get("PUMP_API_TIMEOUT", 0.5)),
+    failure_threshold=int(os.environ.get("PUMP_API_FAILURES", 3)),
+    reset_timeout=float(os.environ.get("PUMP_API_RESET_S", 10)),
+)
+_pending = 0
+
+
+class InferenceBusy(RuntimeError):
+    pass
+
+
+async def run_inference(fn, *args):
+    """Run a CPU-bound call on the inference pool; reject when too many are waiting"""
+    global _pending
+    if _pending >= INFER_QUEUE:
+        raise InferenceBusy('inference queue full')
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    finally:
+        _pending -= 1
+
+
+def _local_predict(sensor_data):
+    predictor = api_server.predictor
+    if predictor:
+        return predictor.predict(sensor_data)
+    return rule_based_prediction(sensor_data)
+
+
+def _local_predict_batch(readings, rows):
+    predictor = api_server.predictor
+    if predictor:
+        return predictor.predict_batch(readings)
+    return [rule_based_prediction(r) for r in rows]
+
+
+async def _json_body(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+async def health(request):
+    return JSONResponse({
+        'status': 'running',
+        'ml_models_loaded': api_server.predictor is not None,
+        'model_status': model_status,
+        'server': 'asgi',
+    })
+
+
+async def ready(request):
+    return JSONResponse(model_status, status_code=200 if api_server.predictor is not None else 503)
+
+
+async def metrics(request):
+    stats = pump_client.stats()
+    stats['inference_pending'] = _pending
+    return JSONResponse(stats)
+
+
+async def predict(request):
+    sensor_data = await _json_body(request)
+    if not sensor_data:
+        return JSONResponse({'error': 'No sensor data provided'}, status_code=400)
+    try:
+        pump_task = asyncio.create_task(pump_client.predict(sensor_data))
+        try:
+            result = await run_inference(_local_predict, sensor_data)
+        except Exception:
+            pump_task.cancel()
+            raise
+        pump = await pump_task
+        if pump:
+            merge_pump_result(result, pump)
+        pump_client.record_source(result.get('prediction_source'))
+        return JSONResponse(result)
+    except InferenceBusy as e:
+        return JSONResponse({'error': str(e)}, status_code=503)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def predict_batch(request):
+    body = await _json_body(request)
+    readings = (body.get('columns') or body.get('readings')) if isinstance(body, dict) else body
+    if not readings:
+        return JSONResponse({'error': 'No sensor data provided'}, status_code=400)
+    try:
+        rows = readings
+        if isinstance(readings, dict):
+            names = list(readings.keys())
+            rows = [dict(zip(names, values)) for values in zip(*readings.values())]
+        pump_task = asyncio.create_task(pump_client.predict(rows, timeout=PUMP_API_BATCH_TIMEOUT))
+        try:
+            results = await run_inference(_local_predict_batch, readings, rows)
+        except Exception:
+            pump_task.cancel()
+            raise
+        pumps = await pump_task
+        if isinstance(pumps, list):
+            for result, pump in zip(results, pumps):
+                merge_pump_result(result, pump)
+        for result in results:
+            pump_client.record_source(result.get('prediction_source'))
+        return JSONResponse({'count': len(results), 'predictions': results})
+    except InferenceBusy as e:
+        return JSONResponse({'error': str(e)}, status_code=503)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    api_server.load_models_async()
+    yield
+    await pump_client.aclose()
+    executor.shutdown(wait=False)
+
+
+app = Starlette(
+    routes=[
+        Route('/health', health, methods=['GET']),
+        Route('/ready', ready, methods=['GET']),
+        Route('/metrics', metrics, methods=['GET']),
+        Route('/predict', predict, methods=['POST']),
+        Route('/predict_batch', predict_batch, methods=['POST']),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan,
+)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.environ.get('PORT', 5001))
+    print(f"Python ML API (ASGI) on port {port}")
+    uvicorn.run(app, host='0.0.0.0', port=port, log_level='warning')
@@ -0,0 +1,55 @@
+"""
+Benchmark: LSTM sequence building, Python loop (old train_lstm) vs sequences.py
+
+  python bench_sequences.py --rows 2000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from sequences import SEQUENCE_LENGTH, create_sequences
+
+
+def create_sequences_loop(X, y, seq_len):
+    X_seq, y_seq = [], []
+    for i in range(len(X) - seq_len + 1):
+        X_seq.append(X[i:i+seq_len])
+        y_seq.append(y[i+seq_len-1])
+    return np.array(X_seq), np.array(y_seq)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--features', type=int, default=8)
+    parser.add_argument('--seq-len', type=int, default=SEQUENCE_LENGTH)
+    parser.add_argument('--skip-loop', action='store_true', help='only time the vectorized builder')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((args.rows, args.features))
+    y = rng.integers(0, 4, args.rows)
+
+    (view, y_view), t_view = timed(create_sequences, X, y, args.seq_len)
+    (dense, _), t_copy = timed(create_sequences, X, y, args.seq_len, copy=True, dtype=np.float32)
+    print(f"Rows: {args.rows}  features: {args.features}  seq_len: {args.seq_len}  -> {len(view)} sequences")
+    print(f"view (zero-copy):  {t_view * 1000:9.2f} ms   extra memory: 0 MB")
+    print(f"float32 copy:      {t_copy * 1000:9.2f} ms   extra memory: {dense.nbytes / 1e6:.0f} MB")
+
+    if not args.skip_loop:
+        (X_loop, y_loop), t_loop = timed(create_sequences_loop, X, y, args.seq_len)
+        assert np.array_equal(X_loop.astype(np.float32), dense) and np.array_equal(y_loop, y_view)
+        assert np.array_equal(X_loop, view)
+        print(f"python loop:       {t_loop * 1000:9.2f} ms   ({t_loop / t_copy:.0f}x slower than the copy)")
+
+
+if __name__ == '__main__':
+    main()
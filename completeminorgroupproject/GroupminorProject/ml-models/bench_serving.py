@@ -0,0 +1,87 @@
+"""
+Load generator for the Python services (Flask vs ASGI)
+
+Fires POST requests with a fixed number of concurrent connections and reports
+throughput and latency percentiles. Works against either server mode:
+
+  python api_server.py   &  python bench_serving.py --url http://localhost:5001/predict
+  python asgi_server.py  &  python bench_serving.py --url http://localhost:5001/predict
+  python ../pump_dataset_generator/pump_asgi.py & python bench_serving.py --url http://localhost:5003/predict --devices 50
+
+Needs: pip install httpx
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+
+def make_reading(device):
+    return {
+        'device_id': f'pump-{device}',
+        'vibration_rms': random.uniform(0.2, 1.5),
+        'temperature_C': random.uniform(28, 55),
+        'current_A': random.uniform(1.0, 4.5),
+        'flow_rate_Lmin': random.uniform(1.0, 12.0),
+        'tank_level_cm': random.uniform(10, 80),
+        'ph_value': random.uniform(6.5, 7.5),
+        'turbidity_NTU': random.uniform(5, 60),
+        'pump_runtime_min': random.uniform(0, 120),
+        'pump_status': 'ON',
+    }
+
+
+async def worker(client, url, queue, latencies, errors, devices):
+    while True:
+        try:
+            i = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        start = time.perf_counter()
+        try:
+            r = await client.post(url, json=make_reading(i % devices))
+            if r.status_code != 200:
+                errors.append(r.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(url, total, concurrency, devices):
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            worker(client, url, queue, latencies, errors, devices) for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+
+    print(f"URL: {url}")
+    print(f"Requests: {total}  concurrency: {concurrency}  errors: {len(errors)}")
+    print(f"Throughput: {total / elapsed:.1f} req/s")
+    print(f"Latency ms  p50: {pct(50):.1f}  p95: {pct(95):.1f}  p99: {pct(99):.1f}  max: {latencies[-1] * 1000:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://localhost:5001/predict')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--devices', type=int, default=10, help='distinct device_id values')
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.requests, args.concurrency, args.devices))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Random Forest compiled to flat node arrays for low-latency scoring
+
+CompiledForest concatenates every tree of a fitted RandomForestClassifier into
+contiguous arrays (feature, threshold, children, per-node class probabilities)
+and walks all trees at once, one level per step, so one reading costs a few
+NumPy calls per tree level instead of sklearn's per-call validation and joblib
+dispatch over 100 estimators.
+
+Results match sklearn's predict_proba bit for bit (when it runs with
+n_jobs=None / 1; with threads sklearn's own summation order varies):
+  - inputs are cast to float32 and compared with the float64 thresholds
+    (x <= threshold goes left), as sklearn's tree code does
+  - leaf values are the tree's class fractions (normalized as the installed
+    sklearn does), summed tree by tree in order, then divided by n_trees
+
+  python compiled_forest.py [--model models/random_forest_model.pkl] [--rows 10000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+BATCH_ROWS = 256
+
+
+class CompiledForest:
+    def __init__(self, forest):
+        self.classes_ = forest.classes_
+        self.n_trees = len(forest.estimators_)
+        features, thresholds, children, missing_left, values, roots = [], [], [], [], [], []
+        offset = 0
+        depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            leaf = tree.children_left < 0
+            ids = np.arange(n)
+            # Leaves point at themselves, so extra levels leave finished trees in place
+            left = np.where(leaf, ids, tree.children_left) + offset
+            right = np.where(leaf, ids, tree.children_right) + offset
+            value = tree.value[:, 0, :len(self.classes_)].astype(np.float64)
+            sums = value.sum(axis=1)
+            if not np.allclose(sums, 1.0):
+                # sklearn < 1.4 stores weighted counts and normalizes in predict_proba
+                sums[sums == 0.0] = 1.0
+                value = value / sums[:, None]
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            children.append(np.column_stack([left, right]))
+            missing_left.append(getattr(tree, 'missing_go_to_left', np.zeros(n, dtype=np.uint8)).astype(bool))
+            values.append(value)
+            roots.append(offset)
+            offset += n
+            depth = max(depth, tree.max_depth)
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds).astype(np.float64)
+        # next node = children[2 * node + go_right]
+        self.children = np.concatenate(children).astype(np.intp).ravel()
+        self.missing_left = np.concatenate(missing_left)
+        self.values = np.ascontiguousarray(np.concatenate(values))
+        self.roots = np.array(roots, dtype=np.intp)
+        self.depth = depth
+
+    def _walk(self, flat, offsets=None):
+        """Leaf of every tree; flat is the float32 input, offsets (n, 1) its row starts (None for one row)."""
+        node = self.roots if offsets is None else np.broadcast_to(self.roots, (len(offsets), self.n_trees))
+        has_nan = bool(np.isnan(flat).any())
+        for _ in range(self.depth):
+            index = self.feature[node]
+            v = flat[index if offsets is None else index + offsets]
+            go_right = v > self.threshold[node]
+            if has_nan:
+                # NaN goes to the side chosen at fit time (sklearn's missing_go_to_left)
+                go_right = np.where(np.isnan(v), ~self.missing_left[node], go_right)
+            node = self.children[2 * node + go_right]
+        return node
+
+    def leaves(self, X):
+        """Leaf node of every tree: (n_trees,) for one row, (n, n_trees) for a 2-D X."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            return self._walk(X)
+        offsets = (np.arange(len(X)) * X.shape[1])[:, None]
+        return self._walk(np.ascontiguousarray(X).ravel(), offsets)
+
+    def predict_proba_one(self, x):
+        """Class probabilities (n_classes,) for one feature row."""
+        x = np.asarray(x, dtype=np.float32).ravel()
+        # cumsum adds tree by tree in order, as sklearn's accumulation does
+        return np.cumsum(self.values[self.leaves(x)], axis=0)[-1] / self.n_trees
+
+    def predict_proba(self, X):
+        """Class probabilities (n, n_classes) for a 2-D feature array."""
+        X = np.asarray(X, dtype=np.float32)
+        out = np.empty((len(X), len(self.classes_)))
+        for start in range(0, len(X), BATCH_ROWS):
+            node = self.leaves(X[start:start + BATCH_ROWS])
+            proba = self.values[node[:, 0]]
+            for t in range(1, self.n_trees):  # tree by tree, in order
+                proba += self.values[node[:, t]]
+            out[start:start + len(node)] = proba / self.n_trees
+        return out
+
+    def predict_one(self, x):
+        """(class, probabilities) for one feature row in a single pass."""
+        proba = self.predict_proba_one(x)
+        return self.classes_[np.argmax(proba)], proba
+
+    def predict(self, X):
+        """(classes, probabilities) for a 2-D feature array."""
+        proba = self.predict_proba(X)
+        return self.classes_[np.argmax(proba, axis=1)], proba
+
+
+def verify(forest, X, compiled=None):
+    """(probabilities identical, classes identical) against sklearn for rows X, batch and one by one."""
+    compiled = compiled or CompiledForest(forest)
+    expected = forest.predict_proba(X)
+    batch = compiled.predict_proba(X)
+    single = np.array([compiled.predict_proba_one(row) for row in X])
+    same_proba = np.array_equal(batch, expected) and np.array_equal(single, expected)
+    same_class = np.array_equal(compiled.predict(X)[0], forest.predict(X))
+    return same_proba, same_class
+
+
+def _timed(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+if __name__ == '__main__':
+    import joblib
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='models/random_forest_model.pkl')
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    forest = joblib.load(args.model)
+    start = time.perf_counter()
+    compiled = CompiledForest(forest)
+    print(f"Compiled {compiled.n_trees} trees, {len(compiled.feature)} nodes, depth {compiled.depth} "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+    X = np.random.default_rng(0).normal(size=(args.rows, forest.n_features_in_))
+    print("identical to sklearn (probabilities, classes):", verify(forest, X[:2000], compiled))
+    X_nan = X[:500].copy()
+    X_nan[::3, ::2] = np.nan
+    print("identical with missing values:", verify(forest, X_nan, compiled))
+
+    row = X[:1]
+    sk_one = _timed(lambda: forest.predict_proba(row), 200)
+    cf_one = _timed(lambda: compiled.predict_one(row[0]), 2000)
+    print(f"one row:  sklearn {sk_one * 1e6:8.0f} us   compiled {cf_one * 1e6:6.0f} us  ({sk_one / cf_one:.0f}x)")
+    sk_all = _timed(lambda: forest.predict_proba(X), 3)
+    cf_all = _timed(lambda: compiled.predict_proba(X), 3)
+    print(f"{len(X)} rows: sklearn {len(X) / sk_all:8.0f} rows/s   compiled {len(X) / cf_all:8.0f} rows/s")
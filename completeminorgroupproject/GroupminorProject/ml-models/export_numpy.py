@@ -0,0 +1,57 @@
+"""
+Export Keras models to .npz for the NumPy runtime (numpy_runtime.py)
+
+Run once after training (needs TensorFlow); serving then works without it.
+Each export is checked against Keras on random input.
+
+Usage:
+  python export_numpy.py                      # models/lstm_model.h5 and backend/ml/models/aiml_model.h5
+  python export_numpy.py path/to/model.h5 ...
+"""
+
+import os
+import sys
+import numpy as np
+
+from numpy_runtime import export_keras_model, NumpyModel
+
+TOLERANCE = 1e-4
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODELS = [
+    os.path.join(script_dir, 'models', 'lstm_model.h5'),
+    os.path.join(script_dir, '..', 'backend', 'ml', 'models', 'aiml_model.h5'),
+]
+
+
+def export_and_verify(h5_path, samples=256):
+    """Export one .h5 model next to itself as .npz; return max abs difference vs Keras"""
+    from tensorflow.keras.models import load_model
+
+    model = load_model(h5_path, compile=False)
+    npz_path = os.path.splitext(h5_path)[0] + '.npz'
+    export_keras_model(model, npz_path)
+
+    shape = (samples,) + tuple(model.input_shape[1:])
+    x = np.random.default_rng(0).normal(size=shape).astype(np.float32)
+    expected = model.predict(x, verbose=0)
+    actual = NumpyModel(npz_path).predict(x)
+    return npz_path, float(np.max(np.abs(expected - actual)))
+
+
+def main():
+    paths = sys.argv[1:] or [p for p in DEFAULT_MODELS if os.path.exists(p)]
+    if not paths:
+        print("No .h5 models found. Train first (train_model.py / train_aiml.py).")
+        sys.exit(1)
+    failed = False
+    for path in paths:
+        npz_path, diff = export_and_verify(path)
+        ok = diff <= TOLERANCE
+        failed |= not ok
+        print(f"{'✓' if ok else '✗'} {npz_path} (max abs diff vs Keras: {diff:.2e})")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,417 @@
+"""
+Hyperparameter search for the project's models
+
+Families (search spaces around the configurations the training scripts hardcode):
+  rf     RandomForest, ml-models sensor data     (train_model.py: depth 20)
+  lstm   LSTM, ml-models sensor data             (train_model.py: 64/32)
+  dense  AIML dense classifier, pump dataset     (backend/ml/train_aiml.py: 64/32/16)
+  gru    PumpGRU, pump windows                   (pump_dataset_generator/train_model.py: hidden 32)
+
+- The scaled train/val/test split is built once per (family, dataset contents)
+  and cached as .npy files under --cache-dir; every trial memory-maps it.
+- Trials run in a process pool (--workers, spawn: TensorFlow is not fork-safe).
+- Successive halving: every config gets the smallest resource (trees for rf,
+  epochs otherwise); the best 1/eta by validation accuracy get eta x the
+  resource, and so on. No rung starts after --budget seconds and network
+  trials stop at the deadline.
+- Each trial reports validation/test accuracy and measured single-reading
+  inference latency (p50/p95), through the path the API serves (the compiled
+  forest for rf). --min-accuracy picks the fastest model that
+  reaches the bar, otherwise the most accurate one is reported.
+
+  python hparam_search.py --family rf --dataset datasets/sensor_data.csv --budget 300
+  python hparam_search.py --family gru --dataset ../pump_dataset_generator/model_dataset.csv --min-accuracy 0.9
+"""
+
+import argparse
+import hashlib
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+RANDOM_STATE = 42
+SPLIT_VERSION = 3  # bump when the preprocessing below changes
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SEARCH_SPACES = {
+    'rf': {'max_depth': [10, 20, None], 'min_samples_leaf': [1, 2, 4], 'max_features': ['sqrt', 0.5]},
+    'lstm': {'units': [[32, 16], [64, 32], [128, 64]], 'dropout': [0.0, 0.2], 'lr': [0.001, 0.003]},
+    'dense': {'layers': [[16], [32, 16], [64, 32, 16]], 'dropout': [0.0, 0.2], 'lr': [0.001, 0.003]},
+    'gru': {'hidden': [16, 32, 64], 'lr': [0.001, 0.003], 'batch_size': [128, 512]},
+}
+MIN_RESOURCE = {'rf': 25, 'lstm': 1, 'dense': 1, 'gru': 1}
+
+
+def _import_from(subdir, module):
+    """Import a script module from a sibling project folder (they import each other by bare name)"""
+    path = os.path.join(PROJECT_DIR, subdir)
+    if path not in sys.path:
+        sys.path.append(path)
+    return importlib.import_module(module)
+
+
+def _split_three(X, y, test_size, val_share):
+    """train / val / test with the stratified two-step split the training scripts use"""
+    from sklearn.model_selection import train_test_split
+    X_train, X_temp, y_train, y_temp = train_test_split(
+        X, y, test_size=test_size, random_state=RANDOM_STATE, stratify=y)
+    X_val, X_test, y_val, y_test = train_test_split(
+        X_temp, y_temp, test_size=1 - val_share, random_state=RANDOM_STATE, stratify=y_temp)
+    return {'X_train': X_train, 'y_train': y_train, 'X_val': X_val, 'y_val': y_val,
+            'X_test': X_test, 'y_test': y_test}
+
+
+# ---------------------------------------------------------------- splits
+
+def build_sensor_split(path):
+    """ml-models/train_model.py preprocessing: 8 scaled features, 70/15/15"""
+    import pandas as pd
+    from sklearn.preprocessing import StandardScaler
+    from predict import FEATURE_COLUMNS
+    df = pd.read_csv(path)
+    X = StandardScaler().fit_transform(df[FEATURE_COLUMNS].values).astype(np.float32)
+    return _split_three(X, df['label'].values.astype(np.int64), 0.30, 0.5)
+
+
+def build_aiml_split(path):
+    """backend/ml/train_aiml.py preprocessing: FEATURE_ORDER scaled, 75/12.5/12.5"""
+    from sklearn.preprocessing import StandardScaler
+    train_aiml = _import_from(os.path.join('backend', 'ml'), 'train_aiml')
+    X, y = train_aiml.build_feature_matrix(train_aiml.load_and_prepare_dataset(path))
+    X = StandardScaler().fit_transform(X).astype(np.float32)
+    return _split_three(X, y.astype(np.int64), 0.25, 0.5)
+
+
+def build_window_split(path):
+    """Pump windows: raw series + window indices (80/20 test as train_model.py, 20% of train for val)"""
+    from sklearn.model_selection import train_test_split
+    create_windows = _import_from('pump_dataset_generator', 'create_windows')
+    windowed = _import_from('pump_dataset_generator', 'windowed')
+    features, labels, pumps = create_windows.load_series(path)
+    dataset = windowed.WindowedDataset(features, labels, create_windows.WINDOW, segments=pumps)
+    train_idx, test_idx = train_test_split(np.arange(len(dataset)), test_size=0.2, random_state=RANDOM_STATE)
+    train_idx, val_idx = train_test_split(train_idx, test_size=0.2, random_state=RANDOM_STATE)
+    return {'features': features, 'labels': np.asarray(labels, dtype=np.int64),
+            'segments': np.asarray(pumps, dtype=np.int64).reshape(-1, 2),
+            'train_idx': train_idx, 'val_idx': val_idx, 'test_idx': test_idx}
+
+
+SPLIT_BUILDERS = {'rf': build_sensor_split, 'lstm': build_sensor_split,
+                  'dense': build_aiml_split, 'gru': build_window_split}
+# Families that share a builder share the cached split
+SPLIT_NAMES = {'rf': 'sensor', 'lstm': 'sensor', 'dense': 'aiml', 'gru': 'windows'}
+
+
+def _digest(path):
+    """sha256 of a CSV file, or of every file in a columnar directory"""
+    h = hashlib.sha256()
+    files = [path] if os.path.isfile(path) else [
+        os.path.join(root, name) for root, _, names in sorted(os.walk(path)) for name in sorted(names)]
+    for name in files:
+        with open(name, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+    return h.hexdigest()
+
+
+def cached_split(family, dataset, cache_dir):
+    """Directory of .npy arrays for this family's split; built on first use"""
+    key = hashlib.sha256(
+        f"{SPLIT_NAMES[family]}:{SPLIT_VERSION}:{_digest(dataset)}".encode()).hexdigest()[:16]
+    path = os.path.join(cache_dir, f"{SPLIT_NAMES[family]}-{key}")
+    if os.path.isdir(path):
+        print(f"Using cached split: {path}")
+        return path
+    start = time.perf_counter()
+    arrays = SPLIT_BUILDERS[family](dataset)
+    tmp = path + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, name + '.npy'), np.asarray(array))
+    os.replace(tmp, path)
+    print(f"Built split in {time.perf_counter() - start:.1f}s: {path}")
+    return path
+
+
+def load_split(path):
+    return {name[:-4]: np.load(os.path.join(path, name), mmap_mode='r')
+            for name in os.listdir(path) if name.endswith('.npy')}
+
+
+# ---------------------------------------------------------------- trials
+
+def _latency(fn, x, repeats=50):
+    for _ in range(5):
+        fn(x)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(x)
+        times.append((time.perf_counter() - start) * 1000)
+    return {'p50': float(np.percentile(times, 50)), 'p95': float(np.percentile(times, 95))}
+
+
+def _accuracy(predict, X, y):
+    return float(np.mean(predict(X) == y))
+
+
+def _fit_keras(model, X, y, epochs, batch_size, deadline):
+    """Fit epoch by epoch so the trial can stop at the search deadline; returns epochs run"""
+    for epoch in range(epochs):
+        if time.time() >= deadline:
+            return epoch
+        model.fit(X, y, epochs=1, batch_size=batch_size, verbose=0)
+    return epochs
+
+
+def _numpy_latency(model, x):
+    """Latency of the NumPy runtime export (how the API serves Keras models)"""
+    import tempfile
+    from numpy_runtime import NumpyModel, export_keras_model
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.npz')
+        export_keras_model(model, path)
+        runtime = NumpyModel(path)
+    return _latency(runtime.predict_on_batch, x)
+
+
+def train_rf(params, trees, data, deadline):
+    from sklearn.ensemble import RandomForestClassifier
+    from compiled_forest import CompiledForest
+    model = RandomForestClassifier(n_estimators=trees, min_samples_split=5,
+                                   random_state=RANDOM_STATE, n_jobs=1, **params)
+    model.fit(data['X_train'], data['y_train'])
+    # predict.py serves single readings through the compiled forest (same classes as sklearn)
+    compiled = CompiledForest(model)
+    x_one = np.asarray(data['X_test'][0])
+    return {
+        'val_accuracy': _accuracy(model.predict, data['X_val'], data['y_val']),
+        'test_accuracy': _accuracy(model.predict, data['X_test'], data['y_test']),
+        'latency_ms': _latency(compiled.predict_one, x_one),
+        'sklearn_latency_ms': _latency(model.predict, x_one[None, :]),
+        'trained': trees,
+    }
+
+
+def _keras_trial(model, splits, epochs, batch_size, deadline):
+    def predict(X):
+        return np.argmax(model.predict(X, batch_size=4096, verbose=0), axis=1)
+
+    x_one = np.ascontiguousarray(splits['test'][0][:1])
+    return {
+        'trained': _fit_keras(model, *splits['train'], epochs, batch_size, deadline),
+        'val_accuracy': _accuracy(predict, *splits['val']),
+        'test_accuracy': _accuracy(predict, *splits['test']),
+        'latency_ms': _latency(model.predict_on_batch, x_one),
+        'numpy_latency_ms': _numpy_latency(model, x_one),
+    }
+
+
+def train_lstm(params, epochs, data, deadline):
+    import tensorflow as tf
+    from sequences import SEQUENCE_LENGTH, create_sequences
+    splits = {s: create_sequences(data['X_' + s], data['y_' + s], SEQUENCE_LENGTH, copy=True, dtype=np.float32)
+              for s in ('train', 'val', 'test')}
+    num_classes = int(max(data['y_train'].max(), data['y_val'].max(), data['y_test'].max())) + 1
+    units, dropout = params['units'], params['dropout']
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(SEQUENCE_LENGTH, data['X_train'].shape[1])),
+        tf.keras.layers.LSTM(units[0], return_sequences=True),
+        tf.keras.layers.Dropout(dropout),
+        tf.keras.layers.LSTM(units[1]),
+        tf.keras.layers.Dropout(dropout),
+        tf.keras.layers.Dense(16, activation='relu'),
+        tf.keras.layers.Dense(num_classes, activation='softmax'),
+    ])
+    model.compile(optimizer=tf.keras.optimizers.Adam(params['lr']), loss='sparse_categorical_crossentropy')
+    return _keras_trial(model, splits, epochs, 32, deadline)
+
+
+def train_dense(params, epochs, data, deadline):
+    import tensorflow as tf
+    splits = {s: (np.asarray(data['X_' + s]), np.asarray(data['y_' + s])) for s in ('train', 'val', 'test')}
+    layers = [tf.keras.layers.Input(shape=(data['X_train'].shape[1],))]
+    for units in params['layers']:
+        layers += [tf.keras.layers.Dense(units, activation='relu'), tf.keras.layers.Dropout(params['dropout'])]
+    layers.append(tf.keras.layers.Dense(4, activation='softmax'))
+    model = tf.keras.Sequential(layers)
+    model.compile(optimizer=tf.keras.optimizers.Adam(params['lr']), loss='sparse_categorical_crossentropy')
+    return _keras_trial(model, splits, epochs, 64, deadline)
+
+
+def train_gru(params, epochs, data, deadline):
+    import torch
+    import torch.nn as nn
+    windowed = _import_from('pump_dataset_generator', 'windowed')
+    PumpGRU = _import_from('pump_dataset_generator', 'model_pump_gru').PumpGRU
+    dataset = windowed.WindowedDataset(data['features'], data['labels'], 50,
+                                       segments=[tuple(s) for s in data['segments']])
+    train_idx = np.asarray(data['train_idx'])
+    y_train = dataset.targets(train_idx)
+    weights = 1.0 / (np.bincount(y_train, minlength=3) + 1)
+    weights = torch.tensor(weights / weights.sum() * 3, dtype=torch.float32)
+
+    torch.manual_seed(RANDOM_STATE)
+    model = PumpGRU(input_size=4, hidden_size=params['hidden'], num_classes=3)
+    loss_fn = nn.CrossEntropyLoss(weight=weights)
+    opt = torch.optim.Adam(model.parameters(), lr=params['lr'])
+    rng = np.random.default_rng(RANDOM_STATE)
+    trained = 0
+    for epoch in range(epochs):
+        if time.time() >= deadline:
+            break
+        model.train()
+        for X, y in dataset.batches(rng.permutation(train_idx), params['batch_size']):
+            loss = loss_fn(model(torch.from_numpy(X)), torch.from_numpy(y.astype(np.int64)))
+            opt.zero_grad()
+            loss.backward()
+            opt.step()
+        trained += 1
+
+    model.eval()
+
+    def accuracy(idx):
+        correct = 0
+        with torch.no_grad():
+            for X, y in dataset.batches(np.asarray(idx), 4096):
+                correct += int((model(torch.from_numpy(X)).argmax(1).numpy() == y).sum())
+        return correct / max(len(idx), 1)
+
+    x_one = torch.from_numpy(dataset.windows(np.asarray(data['test_idx'][:1])))
+    with torch.no_grad():
+        latency = _latency(model, x_one)
+    return {'trained': trained, 'val_accuracy': accuracy(data['val_idx']),
+            'test_accuracy': accuracy(data['test_idx']), 'latency_ms': latency}
+
+
+TRAINERS = {'rf': train_rf, 'lstm': train_lstm, 'dense': train_dense, 'gru': train_gru}
+
+
+def _set_threads(family, threads):
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+    if family == 'gru':
+        import torch
+        torch.set_num_threads(threads)
+    elif family in ('lstm', 'dense'):
+        import tensorflow as tf
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(threads)
+        except RuntimeError:
+            pass  # already initialized in this worker
+
+
+def run_trial(family, params, resource, split_path, deadline, threads):
+    """One configuration at one resource level (runs in a worker process)"""
+    start = time.perf_counter()
+    try:
+        _set_threads(family, threads)
+        result = TRAINERS[family](params, resource, load_split(split_path), deadline)
+        result['truncated'] = result['trained'] < resource
+    except Exception as e:
+        result = {'error': f'{type(e).__name__}: {e}', 'val_accuracy': -1.0}
+    result['train_seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+# ---------------------------------------------------------------- search
+
+def grid(space):
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+
+def successive_halving(family, configs, split_path, workers, threads, budget, eta, max_rungs):
+    deadline = time.time() + budget
+    resource = MIN_RESOURCE[family]
+    survivors = configs
+    trials = []
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        for rung in range(max_rungs):
+            if not survivors or time.time() >= deadline:
+                break
+            futures = [pool.submit(run_trial, family, p, resource, split_path, deadline, threads)
+                       for p in survivors]
+            rung_trials = []
+            for params, future in zip(survivors, futures):
+                trial = dict(future.result(), params=params, rung=rung, resource=resource)
+                rung_trials.append(trial)
+                latency = trial.get('latency_ms', {}).get('p50', float('nan'))
+                print(f"rung {rung} r={resource:<4} val={trial['val_accuracy']:.4f} "
+                      f"p50={latency:.2f}ms {params}" + (f"  ERROR {trial['error']}" if 'error' in trial else ''))
+            trials += rung_trials
+            ranked = sorted((t for t in rung_trials if 'error' not in t),
+                            key=lambda t: t['val_accuracy'], reverse=True)
+            if len(ranked) <= 1:
+                break
+            survivors = [t['params'] for t in ranked[:max(1, len(ranked) // eta)]]
+            resource *= eta
+    return trials
+
+
+def pick_best(trials, min_accuracy=None):
+    """Each config's furthest rung; fastest above min_accuracy, else most accurate"""
+    final = {}
+    for t in trials:
+        if 'error' not in t:
+            final[json.dumps(t['params'], sort_keys=True)] = t
+    candidates = list(final.values())
+    if not candidates:
+        return None
+    if min_accuracy is not None:
+        passing = [t for t in candidates if t['val_accuracy'] >= min_accuracy]
+        if passing:
+            return min(passing, key=lambda t: t['latency_ms']['p50'])
+    return max(candidates, key=lambda t: t['val_accuracy'])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--family', choices=sorted(TRAINERS), required=True)
+    parser.add_argument('--dataset', required=True, help='CSV (or .cols directory for dense / gru)')
+    parser.add_argument('--budget', type=float, default=600, help='seconds')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=1, help='threads per trial')
+    parser.add_argument('--eta', type=int, default=3, help='keep 1/eta of configs per rung')
+    parser.add_argument('--max-rungs', type=int, default=3)
+    parser.add_argument('--min-accuracy', type=float, default=None)
+    parser.add_argument('--cache-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '.search_cache'))
+    parser.add_argument('--output', default=None, help='default: search_results_<family>.json')
+    args = parser.parse_args()
+
+    os.makedirs(args.cache_dir, exist_ok=True)
+    dataset = os.path.abspath(args.dataset)
+    configs = grid(SEARCH_SPACES[args.family])
+    print(f"Search: {args.family}, {len(configs)} configs, budget {args.budget:.0f}s, "
+          f"{args.workers} workers x {args.threads} threads")
+
+    start = time.perf_counter()
+    split_path = cached_split(args.family, dataset, args.cache_dir)
+    trials = successive_halving(args.family, configs, split_path, args.workers, args.threads,
+                                args.budget, args.eta, args.max_rungs)
+    best = pick_best(trials, args.min_accuracy)
+    elapsed = time.perf_counter() - start
+
+    output = args.output or f'search_results_{args.family}.json'
+    with open(output, 'w') as f:
+        json.dump({'family': args.family, 'dataset': dataset, 'budget_s': args.budget,
+                   'elapsed_s': round(elapsed, 1), 'min_accuracy': args.min_accuracy,
+                   'best': best, 'trials': trials}, f, indent=2)
+    print(f"\n{len(trials)} trials in {elapsed:.1f}s -> {output}")
+    if best:
+        print(f"Best: {best['params']}  val={best['val_accuracy']:.4f}  "
+              f"test={best['test_accuracy']:.4f}  p50={best['latency_ms']['p50']:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
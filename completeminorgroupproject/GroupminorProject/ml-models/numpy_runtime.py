@@ -0,0 +1,149 @@
+"""
+Pure-NumPy inference for the Keras models (no TensorFlow at serve time)
+
+Supports the layers used by this project:
+- LSTM (ml-models/train_model.py)
+- Dense, BatchNormalization, Dropout (backend/ml/train_aiml.py)
+
+export_keras_model() writes a model's layer configs and weights to a plain
+.npz file (needs TensorFlow once, at export time). NumpyModel loads that file
+and runs the forward pass with NumPy only.
+"""
+
+import json
+import numpy as np
+
+SUPPORTED_LAYERS = ('InputLayer', 'LSTM', 'Dense', 'Dropout', 'BatchNormalization')
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    None: lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+    'hard_sigmoid': lambda x: np.clip(0.2 * x + 0.5, 0, 1),
+    'softmax': _softmax,
+}
+
+
+def _activation(name):
+    if name not in ACTIVATIONS:
+        raise ValueError(f"Unsupported activation: {name}")
+    return ACTIVATIONS[name]
+
+
+def export_keras_model(model, path):
+    """Write layer specs + weights of a Keras Sequential model to an .npz file"""
+    spec = []
+    arrays = {}
+    for i, layer in enumerate(model.layers):
+        kind = layer.__class__.__name__
+        if kind not in SUPPORTED_LAYERS:
+            raise ValueError(f"Unsupported layer for NumPy runtime: {kind}")
+        config = layer.get_config()
+        weights = layer.get_weights()
+        entry = {'type': kind, 'weights': len(weights)}
+        if kind == 'LSTM':
+            entry.update(
+                units=config['units'],
+                activation=config.get('activation', 'tanh'),
+                recurrent_activation=config.get('recurrent_activation', 'sigmoid'),
+                return_sequences=config.get('return_sequences', False),
+                use_bias=config.get('use_bias', True),
+            )
+            if config.get('go_backwards') or config.get('stateful'):
+                raise ValueError("go_backwards / stateful LSTM is not supported")
+        elif kind == 'Dense':
+            entry.update(activation=config.get('activation', 'linear'), use_bias=config.get('use_bias', True))
+        elif kind == 'BatchNormalization':
+            entry.update(
+                epsilon=config.get('epsilon', 1e-3),
+                center=config.get('center', True),
+                scale=config.get('scale', True),
+            )
+        spec.append(entry)
+        for j, w in enumerate(weights):
+            arrays[f'layer{i}_{j}'] = np.asarray(w, dtype=np.float32)
+    arrays['spec'] = np.array(json.dumps(spec))
+    np.savez(path, **arrays)
+    return path
+
+
+class NumpyModel:
+    """Forward pass of an exported Keras model using NumPy only.
+    predict() / predict_on_batch() mirror the Keras methods used by predict.py."""
+
+    def __init__(self, path):
+        data = np.load(path, allow_pickle=False)
+        self.path = path
+        self.spec = json.loads(str(data['spec']))
+        self.weights = [
+            [data[f'layer{i}_{j}'] for j in range(layer['weights'])]
+            for i, layer in enumerate(self.spec)
+        ]
+
+    def _lstm(self, x, layer, weights):
+        units = layer['units']
+        kernel, recurrent = weights[0], weights[1]
+        bias = weights[2] if layer['use_bias'] else 0
+        act = _activation(layer['activation'])
+        rec_act = _activation(layer['recurrent_activation'])
+        batch, steps, _ = x.shape
+        # Input projection for every timestep at once; gate order is i, f, c, o
+        xw = x @ kernel + bias
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        outputs = []
+        for t in range(steps):
+            z = xw[:, t] + h @ recurrent
+            i = rec_act(z[:, :units])
+            f = rec_act(z[:, units:2 * units])
+            g = act(z[:, 2 * units:3 * units])
+            o = rec_act(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * act(c)
+            if layer['return_sequences']:
+                outputs.append(h)
+        return np.stack(outputs, axis=1) if layer['return_sequences'] else h
+
+    def _batch_norm(self, x, layer, weights):
+        weights = list(weights)
+        gamma = weights.pop(0) if layer['scale'] else 1.0
+        beta = weights.pop(0) if layer['center'] else 0.0
+        mean, var = weights
+        return (x - mean) / np.sqrt(var + layer['epsilon']) * gamma + beta
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        for layer, weights in zip(self.spec, self.weights):
+            kind = layer['type']
+            if kind == 'LSTM':
+                x = self._lstm(x, layer, weights)
+            elif kind == 'Dense':
+                x = x @ weights[0]
+                if layer['use_bias']:
+                    x = x + weights[1]
+                x = _activation(layer['activation'])(x)
+            elif kind == 'BatchNormalization':
+                x = self._batch_norm(x, layer, weights)
+            # InputLayer and Dropout are identity at inference
+        return x
+
+    def predict_on_batch(self, x):
+        return self(x)
+
+    def predict(self, x, batch_size=1024, verbose=0):
+        x = np.asarray(x, dtype=np.float32)
+        if len(x) <= batch_size:
+            return self(x)
+        return np.concatenate([self(x[i:i + batch_size]) for i in range(0, len(x), batch_size)])
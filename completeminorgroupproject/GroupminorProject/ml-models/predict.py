@@ -6,29 +6,83 @@ Uses trained ML models to predict:
 2. Leakage detection
 3. Blockage detection
 4. Failure prediction
+
+predict() scores one reading; predict_batch() scores many readings with one
+call per model (RF, Isolation Forest, LSTM).
+
+If models/lstm_model.npz exists (see export_numpy.py) the LSTM runs on the
+NumPy runtime and TensorFlow is not imported.
+
+The Random Forest is compiled to flat node arrays at load (compiled_forest.py,
+identical probabilities) and scores single readings and batches of up to
+ML_COMPILED_RF_MAX_ROWS rows; larger batches use sklearn. ML_COMPILED_RF=0
+always uses sklearn.
+
+ML_ANOMALY_MODE=streaming scores anomalies against a per-pump baseline
+(streaming_anomaly.py, keyed by the reading's device_id) instead of the static
+Isolation Forest, which still scores a pump's first readings while its
+baseline warms up.
 """
 
+import os
+import time
 import numpy as np
 import joblib
-import tensorflow as tf
-from tensorflow.keras.models import load_model
 import json
 
+from compiled_forest import CompiledForest
+from numpy_runtime import NumpyModel
+from sequences import SEQUENCE_LENGTH, sliding_sequences
+from streaming_anomaly import StreamingAnomalyDetector
+
+COMPILED_RF = os.environ.get('ML_COMPILED_RF', '1') == '1'
+# Above this many rows sklearn's Cython traversal outruns the per-level NumPy calls
+COMPILED_RF_MAX_ROWS = int(os.environ.get('ML_COMPILED_RF_MAX_ROWS', 256))
+ANOMALY_MODE = os.environ.get('ML_ANOMALY_MODE', 'isolation_forest')  # or 'streaming'
+
+FEATURE_COLUMNS = [
+    'vibration_rms', 'temperature_C', 'current_A', 'flow_rate_Lmin',
+    'tank_level_cm', 'ph_value', 'turbidity_NTU', 'pump_runtime_min'
+]
+
+CONDITION_MAP = {
+    0: 'Normal',
+    1: 'Leakage Detected',
+    2: 'Blockage Suspected',
+    3: 'Failure Risk High'
+}
+
 class IrrigationPredictor:
     def __init__(self, model_dir='models'):
         """Initialize predictor with trained models"""
         self.model_dir = model_dir
         self.scaler = joblib.load(f'{model_dir}/scaler.pkl')
         self.rf_model = joblib.load(f'{model_dir}/random_forest_model.pkl')
-        self.lstm_model = load_model(f'{model_dir}/lstm_model.h5')
+        self.rf_compiled = CompiledForest(self.rf_model) if COMPILED_RF else None
+        self.lstm_model = self.load_lstm(model_dir)
         self.iso_model = joblib.load(f'{model_dir}/isolation_forest_model.pkl')
+        self.stream_anomaly = (StreamingAnomalyDetector(len(FEATURE_COLUMNS))
+                               if ANOMALY_MODE == 'streaming' else None)
         
         # LSTM sequence buffer
         self.sequence_buffer = []
-        self.sequence_length = 10
+        self.sequence_length = SEQUENCE_LENGTH
+        self.last_timings = {}
         
         print("ML models loaded successfully")
     
+    @staticmethod
+    def load_lstm(model_dir):
+        """NumPy export when present and not older than the .h5, else the Keras .h5 (imports TensorFlow)"""
+        npz_path = f'{model_dir}/lstm_model.npz'
+        h5_path = f'{model_dir}/lstm_model.h5'
+        if os.path.exists(npz_path) and (
+            not os.path.exists(h5_path) or os.path.getmtime(npz_path) >= os.path.getmtime(h5_path)
+        ):
+            return NumpyModel(npz_path)
+        from tensorflow.keras.models import load_model
+        return load_model(h5_path)
+    
     def preprocess(self, sensor_data):
         """Preprocess sensor data for prediction"""
         features = np.array([[
@@ -43,31 +97,52 @@ class IrrigationPredictor:
         ]])
         
         # Normalize
-        features_scaled = self.scaler.transform(features)
-        return features_scaled
+        return self.scale(features)
     
-    def predict_condition(self, sensor_data):
-        """Predict pump condition using Random Forest"""
-        features = self.preprocess(sensor_data)
-        prediction = self.rf_model.predict(features)[0]
-        probabilities = self.rf_model.predict_proba(features)[0]
-        
-        condition_map = {
-            0: 'Normal',
-            1: 'Leakage Detected',
-            2: 'Blockage Suspected',
-            3: 'Failure Risk High'
-        }
+    def scale(self, features):
+        """Apply the fitted StandardScaler (same arithmetic as transform, without its input validation)"""
+        if hasattr(self.scaler, 'mean_') and hasattr(self.scaler, 'scale_'):
+            features = features - self.scaler.mean_ if self.scaler.with_mean else features.copy()
+            if self.scaler.with_std:
+                features /= self.scaler.scale_
+            return features
+        return self.scaler.transform(features)
+    
+    @staticmethod
+    def expected_flow(current):
+        """Expected flow from current draw (calibrate based on your pump)"""
+        return current * 2.5  # Example: 2.5 L/min per Ampere
+    
+    def condition_from_proba(self, probabilities):
+        """Condition dict from one row of Random Forest class probabilities"""
+        # Same as rf_model.predict: class with the highest probability
+        prediction = self.rf_model.classes_[np.argmax(probabilities)]
         
         return {
             'condition_code': int(prediction),
-            'condition': condition_map[prediction],
+            'condition': CONDITION_MAP[prediction],
             'confidence': float(max(probabilities))
         }
     
-    def predict_failure_lstm(self, sensor_data):
+    def rf_proba(self, features_scaled):
+        """Random Forest class probabilities (n, n_classes); compiled forest for small inputs"""
+        if self.rf_compiled is not None and len(features_scaled) <= COMPILED_RF_MAX_ROWS:
+            if len(features_scaled) == 1:
+                return self.rf_compiled.predict_proba_one(features_scaled[0])[None, :]
+            return self.rf_compiled.predict_proba(features_scaled)
+        return self.rf_model.predict_proba(features_scaled)
+    
+    def predict_condition(self, sensor_data, features=None):
+        """Predict pump condition using Random Forest"""
+        if features is None:
+            features = self.preprocess(sensor_data)
+        probabilities = self.rf_proba(features)[0]
+        return self.condition_from_proba(probabilities)
+    
+    def predict_failure_lstm(self, sensor_data, features=None):
         """Predict failure using LSTM (time-series)"""
-        features = self.preprocess(sensor_data)
+        if features is None:
+            features = self.preprocess(sensor_data)
         
         # Add to sequence buffer
         self.sequence_buffer.append(features[0])
@@ -79,10 +154,11 @@ class IrrigationPredictor:
             return {'failure_probability': 0.0, 'status': 'insufficient_data'}
         
         # Create sequence
-        sequence = np.array([self.sequence_buffer])
+        sequence = np.array([self.sequence_buffer], dtype=np.float32)
         
-        # Predict
-        prediction = self.lstm_model.predict(sequence, verbose=0)
+        # Predict (predict_on_batch reuses the compiled function; predict() sets up a
+        # data pipeline on every call, which dominates for a single sequence)
+        prediction = np.asarray(self.lstm_model.predict_on_batch(sequence))
         failure_prob = prediction[0][3]  # Class 3 = Failure Risk
         
         return {
@@ -90,25 +166,37 @@ class IrrigationPredictor:
             'status': 'predicted'
         }
     
-    def detect_anomaly(self, sensor_data):
-        """Detect anomalies using Isolation Forest"""
-        features = self.preprocess(sensor_data)
-        prediction = self.iso_model.predict(features)[0]
-        
+    def anomaly_scores(self, device_ids, features_scaled):
+        """(scores, is_anomaly) for scaled rows: Isolation Forest, or the per-pump
+        streaming baseline (which learns the rows) with Isolation Forest while it warms up"""
+        if self.stream_anomaly is None:
+            scores = self.iso_model.score_samples(features_scaled)
+            # IsolationForest.predict() is -1 where score_samples - offset_ < 0
+            return scores, scores - self.iso_model.offset_ < 0
+        scores, is_anomaly, warming, _ = self.stream_anomaly.score_samples(device_ids, features_scaled)
+        if warming.any():
+            iso_scores = self.iso_model.score_samples(features_scaled[warming])
+            scores[warming] = iso_scores
+            is_anomaly[warming] = iso_scores - self.iso_model.offset_ < 0
+        return scores, is_anomaly
+    
+    def detect_anomaly(self, sensor_data, features=None):
+        """Detect anomalies (Isolation Forest or per-pump streaming baseline)"""
+        if features is None:
+            features = self.preprocess(sensor_data)
+        scores, is_anomaly = self.anomaly_scores([sensor_data.get('device_id', 'default')], features)
         return {
-            'is_anomaly': prediction == -1,
-            'anomaly_score': float(self.iso_model.score_samples(features)[0])
+            'is_anomaly': bool(is_anomaly[0]),
+            'anomaly_score': float(scores[0])
         }
     
-    def calculate_performance(self, sensor_data):
+    def calculate_performance(self, sensor_data, expected_flow=None):
         """Calculate pump performance efficiency"""
         # Performance = (Actual Flow / Expected Flow) * 100
         # Expected flow based on current consumption
-        current = sensor_data['current_A']
         flow = sensor_data['flow_rate_Lmin']
-        
-        # Expected flow (calibrate based on your pump)
-        expected_flow = current * 2.5  # Example: 2.5 L/min per Ampere
+        if expected_flow is None:
+            expected_flow = self.expected_flow(sensor_data['current_A'])
         
         if expected_flow > 0:
             efficiency = min(100, (flow / expected_flow) * 100)
@@ -121,17 +209,16 @@ class IrrigationPredictor:
             'actual_flow': float(flow)
         }
     
-    def detect_leakage(self, sensor_data):
+    def detect_leakage(self, sensor_data, expected_flow=None):
         """Detect leakage based on flow analysis"""
         flow = sensor_data['flow_rate_Lmin']
-        current = sensor_data['current_A']
-        tank_level = sensor_data['tank_level_cm']
         
         # Leakage indicators:
         # 1. Flow rate lower than expected for given current
         # 2. Tank level dropping faster than expected
         
-        expected_flow = current * 2.5
+        if expected_flow is None:
+            expected_flow = self.expected_flow(sensor_data['current_A'])
         flow_ratio = flow / expected_flow if expected_flow > 0 else 0
         
         leakage_detected = flow_ratio < 0.7  # Flow < 70% of expected
@@ -169,13 +256,31 @@ class IrrigationPredictor:
         }
     
     def predict(self, sensor_data):
-        """Complete prediction pipeline"""
-        # Get all predictions
-        condition = self.predict_condition(sensor_data)
-        failure = self.predict_failure_lstm(sensor_data)
-        anomaly = self.detect_anomaly(sensor_data)
-        performance = self.calculate_performance(sensor_data)
-        leakage = self.detect_leakage(sensor_data)
+        """Complete prediction pipeline.
+        Single pass: features are scaled once, each model runs once and
+        expected flow is derived once. Per-stage times go to 'timings_ms'."""
+        timings = {}
+        start = time.perf_counter()
+        
+        def lap(stage):
+            nonlocal start
+            now = time.perf_counter()
+            timings[stage] = round((now - start) * 1000, 3)
+            start = now
+        
+        features = self.preprocess(sensor_data)
+        expected_flow = self.expected_flow(sensor_data['current_A'])
+        lap('preprocess')
+        
+        condition = self.predict_condition(sensor_data, features)
+        lap('random_forest')
+        failure = self.predict_failure_lstm(sensor_data, features)
+        lap('lstm')
+        anomaly = self.detect_anomaly(sensor_data, features)
+        lap('isolation_forest')
+        
+        performance = self.calculate_performance(sensor_data, expected_flow)
+        leakage = self.detect_leakage(sensor_data, expected_flow)
         blockage = self.detect_blockage(sensor_data)
         
         # Calculate health score
@@ -190,6 +295,9 @@ class IrrigationPredictor:
         recommendations = self.generate_recommendations(
             condition, leakage, blockage, failure
         )
+        lap('rules')
+        timings['total'] = round(sum(timings.values()), 3)
+        self.last_timings = timings
         
         return {
             'timestamp': sensor_data.get('timestamp', ''),
@@ -203,9 +311,130 @@ class IrrigationPredictor:
             'blockage_detected': blockage['blockage_detected'],
             'is_anomaly': anomaly['is_anomaly'],
             'alerts': alerts,
-            'recommendations': recommendations
+            'recommendations': recommendations,
+            'timings_ms': timings
         }
     
+    def build_feature_matrix(self, readings):
+        """Raw (n, 8) feature array from a list of reading dicts or a dict of columns.
+        Only pump_runtime_min may be missing (0); any other missing feature raises KeyError."""
+        if isinstance(readings, dict):
+            missing = [name for name in FEATURE_COLUMNS[:-1] if name not in readings]
+            if missing:
+                raise KeyError('missing feature column(s): ' + ', '.join(missing))
+            columns = [np.asarray(readings[name], dtype=float) for name in FEATURE_COLUMNS[:-1]]
+            runtime = readings.get('pump_runtime_min')
+            columns.append(np.zeros(len(columns[0])) if runtime is None else np.asarray(runtime, dtype=float))
+            return np.column_stack(columns)
+        return np.array([
+            [r[name] for name in FEATURE_COLUMNS[:-1]] + [r.get('pump_runtime_min', 0)]
+            for r in readings
+        ], dtype=float)
+    
+    def predict_failure_lstm_batch(self, features_scaled):
+        """LSTM failure probability for consecutive scaled readings in one model call.
+        Readings continue the sequence buffer; the first ones may lack history."""
+        n = len(features_scaled)
+        history = np.array(self.sequence_buffer).reshape(-1, features_scaled.shape[1])
+        stream = np.concatenate([history, features_scaled])
+        failure_prob = np.zeros(n)
+        # Reading j ends the window stream[start + j - seq_len + 1 : start + j + 1]
+        first = max(0, self.sequence_length - 1 - len(history))
+        if first < n:
+            windows = sliding_sequences(stream, self.sequence_length)
+            windows = windows[len(history) + first - self.sequence_length + 1:]
+            prediction = self.lstm_model.predict(windows, batch_size=1024, verbose=0)
+            failure_prob[first:] = prediction[:, 3]  # Class 3 = Failure Risk
+        self.sequence_buffer = list(stream[-self.sequence_length:])
+        return failure_prob, first
+    
+    def predict_batch(self, readings):
+        """Score many readings: one RF, one Isolation Forest and one LSTM call.
+        readings: list of sensor dicts (as for predict) or dict of column arrays.
+        Readings are treated as consecutive for the LSTM sequence buffer (and
+        per device_id for the streaming anomaly baseline)."""
+        X = self.build_feature_matrix(readings)
+        n = len(X)
+        if n == 0:
+            return []
+        X_scaled = self.scale(X)
+        
+        probabilities = self.rf_proba(X_scaled)
+        codes = self.rf_model.classes_[np.argmax(probabilities, axis=1)]
+        confidence = probabilities.max(axis=1)
+        
+        failure_prob, first_predicted = self.predict_failure_lstm_batch(X_scaled)
+        
+        if isinstance(readings, dict):
+            device_ids = readings.get('device_id', ['default'] * n)
+        else:
+            device_ids = [r.get('device_id', 'default') for r in readings]
+        _, is_anomaly = self.anomaly_scores(device_ids, X_scaled)
+        
+        vibration, current, flow = X[:, 0], X[:, 2], X[:, 3]
+        expected_flow = self.expected_flow(current)
+        positive = expected_flow > 0
+        safe_expected = np.where(positive, expected_flow, 1.0)
+        efficiency = np.where(positive, np.minimum(100, flow / safe_expected * 100), 0)
+        flow_ratio = np.where(positive, flow / safe_expected, 0)
+        leakage = flow_ratio < 0.7
+        severity = np.where(flow_ratio < 0.5, 'high', np.where(flow_ratio < 0.7, 'medium', 'low'))
+        current_high = current > 4.0
+        flow_low = flow < 3.0
+        vibration_high = vibration > 1.0
+        blockage = (current_high & flow_low) | (vibration_high & flow_low)
+        
+        if isinstance(readings, dict):
+            timestamps = readings.get('timestamp', [''] * n)
+        else:
+            timestamps = [r.get('timestamp', '') for r in readings]
+        
+        results = []
+        for i in range(n):
+            code = int(codes[i])
+            condition = {
+                'condition_code': code,
+                'condition': CONDITION_MAP[code],
+                'confidence': float(confidence[i])
+            }
+            if i >= first_predicted:
+                failure = {'failure_probability': float(failure_prob[i]), 'status': 'predicted'}
+            else:
+                failure = {'failure_probability': 0.0, 'status': 'insufficient_data'}
+            performance = {
+                'performance_efficiency': float(efficiency[i]),
+                'expected_flow': float(expected_flow[i]),
+                'actual_flow': float(flow[i])
+            }
+            leak = {
+                'leakage_detected': bool(leakage[i]),
+                'flow_ratio': float(flow_ratio[i]),
+                'severity': str(severity[i])
+            }
+            block = {
+                'blockage_detected': bool(blockage[i]),
+                'indicators': {
+                    'high_current': bool(current_high[i]),
+                    'low_flow': bool(flow_low[i]),
+                    'high_vibration': bool(vibration_high[i])
+                }
+            }
+            results.append({
+                'timestamp': timestamps[i],
+                'health_score': self.calculate_health_score(condition, failure, performance, leak, block),
+                'condition': condition['condition'],
+                'condition_code': code,
+                'confidence': condition['confidence'],
+                'failure_probability': failure['failure_probability'],
+                'performance_efficiency': performance['performance_efficiency'],
+                'leakage_detected': leak['leakage_detected'],
+                'blockage_detected': block['blockage_detected'],
+                'is_anomaly': bool(is_anomaly[i]),
+                'alerts': self.generate_alerts(condition, leak, block, failure),
+                'recommendations': self.generate_recommendations(condition, leak, block, failure)
+            })
+        return results
+    
     def calculate_health_score(self, condition, failure, performance, leakage, blockage):
         """Calculate overall health score (0-100)"""
         base_score = 100
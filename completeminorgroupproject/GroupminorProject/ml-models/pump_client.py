@@ -0,0 +1,171 @@
+"""
+Pooled client for the Pump Health API (port 5003) with a circuit breaker
+
+- One requests.Session with a connection pool (keep-alive), shared by all requests
+- submit() starts the call on a thread pool so it overlaps local inference
+- After PUMP_API_FAILURES consecutive failures the circuit opens and calls are
+  skipped for PUMP_API_RESET_S seconds; then one trial call is let through
+- stats() counts calls, failures, skips and which source won each prediction
+
+AsyncPumpHealthClient is the asyncio variant (httpx) used by asgi_server.py.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failures -> half_open after reset_timeout -> closed on success"""
+
+    def __init__(self, failure_threshold=3, reset_timeout=10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class _PumpClientBase:
+    """Breaker, metrics and stats() shared by the sync and async clients"""
+
+    def __init__(self, base_url, timeout, failure_threshold, reset_timeout):
+        self.url = f"{base_url.rstrip('/')}/predict"
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._lock = threading.Lock()
+        self.metrics = {
+            'calls': 0,
+            'failures': 0,
+            'skipped_open_circuit': 0,
+            'source_pump_ai': 0,
+            'source_local': 0,
+        }
+
+    def _count(self, key):
+        with self._lock:
+            self.metrics[key] += 1
+
+    def _allow(self):
+        """False (and counted) while the circuit is open"""
+        if self.breaker.allow():
+            return True
+        self._count('skipped_open_circuit')
+        return False
+
+    def _failed(self):
+        self._count('failures')
+        self.breaker.record_failure()
+
+    def record_source(self, source):
+        self._count('source_pump_ai' if source == 'pump_ai' else 'source_local')
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self.metrics)
+        metrics['circuit'] = self.breaker.state
+        metrics['consecutive_failures'] = self.breaker.failures
+        metrics['timeout_s'] = self.timeout
+        return metrics
+
+
+class PumpHealthClient(_PumpClientBase):
+    def __init__(self, base_url, timeout=0.5, pool_size=16, failure_threshold=3, reset_timeout=10.0):
+        super().__init__(base_url, timeout, failure_threshold, reset_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='pump-api')
+
+    def _post(self, payload, timeout):
+        self._count('calls')
+        try:
+            r = self.session.post(self.url, json=payload, timeout=timeout)
+            r.raise_for_status()
+            body = r.json()
+        except Exception:
+            self._failed()
+            raise
+        self.breaker.record_success()
+        return body
+
+    def submit(self, payload, timeout=None):
+        """Start the remote call in the background. Returns a Future, or None if the circuit is open."""
+        if not self._allow():
+            return None
+        return self.executor.submit(self._post, payload, timeout or self.timeout)
+
+    def result(self, future, timeout=None):
+        """Pump API response for a submitted call, or None on failure / skip"""
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=(timeout or self.timeout) + 0.05)
+        except Exception:
+            return None
+
+
+class AsyncPumpHealthClient(_PumpClientBase):
+    """Same breaker and metrics; the call runs on the event loop with a pooled httpx.AsyncClient"""
+
+    def __init__(self, base_url, timeout=0.5, pool_size=64, failure_threshold=3, reset_timeout=10.0):
+        import httpx
+
+        super().__init__(base_url, timeout, failure_threshold, reset_timeout)
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    async def predict(self, payload, timeout=None):
+        """Pump API response, or None on failure / open circuit"""
+        if not self._allow():
+            return None
+        self._count('calls')
+        try:
+            r = await self.client.post(self.url, json=payload, timeout=timeout or self.timeout)
+            r.raise_for_status()
+            body = r.json()
+        except Exception:
+            self._failed()
+            return None
+        self.breaker.record_success()
+        return body
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -0,0 +1,30 @@
+"""
+LSTM sequence windows shared by training, evaluation and batch prediction
+
+Sequence i is X[i : i + seq_len] and is labelled with y[i + seq_len - 1]
+(the label of its last reading). Built as a strided view over X, so no rows
+are copied until the caller asks for a contiguous array.
+"""
+
+import numpy as np
+
+SEQUENCE_LENGTH = 10
+
+
+def sliding_sequences(X, seq_len=SEQUENCE_LENGTH):
+    """(N - seq_len + 1, seq_len, F) read-only view of consecutive rows of X (N, F)"""
+    X = np.asarray(X)
+    if len(X) < seq_len:
+        return np.empty((0, seq_len) + X.shape[1:], dtype=X.dtype)
+    return np.lib.stride_tricks.sliding_window_view(X, seq_len, axis=0).transpose(0, 2, 1)
+
+
+def create_sequences(X, y, seq_len=SEQUENCE_LENGTH, copy=False, dtype=None):
+    """(X_seq, y_seq) for LSTM training.
+    copy=True returns a contiguous X_seq (in dtype, e.g. float32 for Keras, which
+    would otherwise make its own float32 copy of the view)."""
+    X_seq = sliding_sequences(X, seq_len)
+    y_seq = np.asarray(y)[seq_len - 1:]
+    if copy:
+        X_seq = np.ascontiguousarray(X_seq, dtype=dtype)
+    return X_seq, y_seq
@@ -20,6 +20,8 @@ from tensorflow.keras.optimizers import Adam
 import joblib
 import json
 
+from sequences import SEQUENCE_LENGTH, create_sequences
+
 # Configuration
 RANDOM_STATE = 42
 TEST_SIZE = 0.15
@@ -100,19 +102,11 @@ def train_lstm(X_train, y_train, X_val, y_val):
     print("="*50)
     
     # Reshape data for LSTM (samples, timesteps, features)
-    # Using sequence length of 10
-    sequence_length = 10
-    
-    # Create sequences
-    def create_sequences(X, y, seq_len):
-        X_seq, y_seq = [], []
-        for i in range(len(X) - seq_len + 1):
-            X_seq.append(X[i:i+seq_len])
-            y_seq.append(y[i+seq_len-1])
-        return np.array(X_seq), np.array(y_seq)
+    # Using sequence length of 10 (strided views, see sequences.py)
+    sequence_length = SEQUENCE_LENGTH
     
-    X_train_seq, y_train_seq = create_sequences(X_train, y_train, sequence_length)
-    X_val_seq, y_val_seq = create_sequences(X_val, y_val, sequence_length)
+    X_train_seq, y_train_seq = create_sequences(X_train, y_train, sequence_length, copy=True, dtype=np.float32)
+    X_val_seq, y_val_seq = create_sequences(X_val, y_val, sequence_length, copy=True, dtype=np.float32)
     
     # One-hot encode labels
     num_classes = len(np.unique(y_train))
@@ -172,8 +166,7 @@ def evaluate_model(model, X_test, y_test, model_type='random_forest'):
     
     if model_type == 'lstm':
         # For LSTM, need to create sequences
-        sequence_length = 10
-        X_test_seq, y_test_seq = create_sequences(X_test, y_test, sequence_length)
+        X_test_seq, y_test_seq = create_sequences(X_test, y_test, SEQUENCE_LENGTH)
         y_test_cat = tf.keras.utils.to_categorical(y_test_seq, len(np.unique(y_test)))
         
         predictions = model.predict(X_test_seq)
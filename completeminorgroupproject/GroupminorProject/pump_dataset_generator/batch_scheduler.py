@@ -0,0 +1,114 @@
+"""
+Micro-batching scheduler for the Pump Health API.
+Concurrent /predict requests are queued, collected for a short window (or until
+max_batch readings are waiting) and run through predict_batch() as one tensor.
+Each caller gets back only its own results.
+
+Knobs (env vars read by pump_api.py):
+  PUMP_BATCH_WINDOW_MS  how long to wait for more requests (default 2)
+  PUMP_BATCH_MAX        flush once this many readings are waiting (default 256)
+  PUMP_QUEUE_MAX        bounded queue; extra requests are rejected (default 4096)
+  PUMP_LATENCY_SLO_MS   target queue wait + inference time; the collect window
+                        shrinks as inference gets slower (default 50)
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class SchedulerBusy(RuntimeError):
+    """Raised when the request queue is full."""
+
+
+class MicroBatcher:
+    def __init__(self, batch_fn, window_ms=2.0, max_batch=256, max_queue=4096, slo_ms=50.0):
+        """batch_fn takes a flat list of readings and returns one result per reading."""
+        self.batch_fn = batch_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.slo = slo_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        # Moving average of batch_fn time, used to keep wait + inference within the SLO
+        self._infer_ema = 0.0
+        self.batches = 0
+        self.requests = 0
+        self.readings = 0
+        self.rejected = 0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="pump-microbatch", daemon=True)
+                self._thread.start()
+
+    def submit(self, readings):
+        """Queue a list of readings; returns a Future resolving to their results."""
+        self._ensure_started()
+        fut = Future()
+        try:
+            self._queue.put_nowait((time.perf_counter(), readings, fut))
+        except queue.Full:
+            self.rejected += 1
+            raise SchedulerBusy("prediction queue full")
+        return fut
+
+    def predict(self, readings, timeout=5.0):
+        """Blocking helper: submit and wait for the results."""
+        return self.submit(readings).result(timeout=timeout)
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        count = len(first[1])
+        wait = max(0.0, min(self.window, self.slo - self._infer_ema))
+        deadline = first[0] + wait
+        while count < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            count += len(item[1])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            flat = [r for _, readings, _ in batch for r in readings]
+            start = time.perf_counter()
+            try:
+                results = self.batch_fn(flat)
+            except Exception as e:
+                for _, _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            elapsed = time.perf_counter() - start
+            self._infer_ema = elapsed if self.batches == 0 else 0.8 * self._infer_ema + 0.2 * elapsed
+            self.batches += 1
+            self.requests += len(batch)
+            self.readings += len(flat)
+            pos = 0
+            for _, readings, fut in batch:
+                fut.set_result(results[pos:pos + len(readings)])
+                pos += len(readings)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "readings": self.readings,
+            "rejected": self.rejected,
+            "avg_batch_size": round(self.readings / self.batches, 2) if self.batches else 0,
+            "inference_ms_ema": round(self._infer_ema * 1000, 3),
+            "queue_depth": self._queue.qsize(),
+            "window_ms": self.window * 1000,
+            "slo_ms": self.slo * 1000,
+        }
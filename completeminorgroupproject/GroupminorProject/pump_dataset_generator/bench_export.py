@@ -0,0 +1,106 @@
+"""
+Benchmark: PumpGRU as eager float32 vs TorchScript vs int8 dynamic quantization.
+
+On the held-out windows (the same 20% split as train_model.py) reports, per format:
+  window    latency of one 50-sample window (batch 1), p50 / p95
+  step      latency of one incremental step: WINDOW staggered states of one pump
+            (realtime_predictor incremental mode)
+  batch     throughput in windows/s at --batch-size
+  size      serialized model size
+  accuracy  against the labels, delta and prediction agreement vs float
+
+  python bench_export.py --windows 20000 --threads 1
+"""
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import torch
+
+from columnar import dataset_path
+from create_windows import WINDOW, load_series
+from export_model import DEPRECATION_NOTICES, load_float, quantize_model, script_model, split
+from model_pump_gru import MODEL_FILES
+from windowed import WindowedDataset
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentiles(fn, *args, repeats=300):
+    for _ in range(20):
+        fn(*args)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(*args)
+        times.append((time.perf_counter() - start) * 1000)
+    return np.percentile(times, 50), np.percentile(times, 95)
+
+
+def predict_all(m, dataset, idx, batch_size):
+    out = []
+    for X, _ in dataset.batches(idx, batch_size):
+        out.append(torch.argmax(m(torch.from_numpy(X)), dim=1).numpy())
+    return np.concatenate(out)
+
+
+def main():
+    warnings.filterwarnings("ignore", message=DEPRECATION_NOTICES)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=os.path.join(script_dir, MODEL_FILES["float"]))
+    parser.add_argument("--dataset", default=None, help="default: model_dataset (.cols or .csv)")
+    parser.add_argument("--windows", type=int, default=20000, help="held-out windows to score (0 = all)")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+    torch.set_num_threads(args.threads)
+
+    features, labels, pumps = load_series(args.dataset or dataset_path(os.path.join(script_dir, "model_dataset")))
+    dataset = WindowedDataset(features, labels, WINDOW, segments=pumps)
+    train_idx, test_idx = split(dataset)
+    # int8 input scaling from the training windows only, as export_model.py fits it
+    mean, std = dataset.input_stats(train_idx)
+    if args.windows:
+        test_idx = test_idx[:args.windows]
+    y = dataset.targets(test_idx)
+    print("Held-out windows:", len(test_idx), "| threads:", torch.get_num_threads())
+
+    float_model = load_float(args.model)
+    models = {
+        "float": float_model,
+        "torchscript": script_model(float_model),
+        "int8": script_model(quantize_model(float_model, mean, std)),
+    }
+    x_one = torch.from_numpy(dataset.windows(test_idx[:1]))
+    x_step = x_one[0]  # one reading per staggered state
+    h_step = torch.zeros(WINDOW, float_model.gru.hidden_size)
+
+    print(f"{'format':12s} {'window p50/p95 ms':>18s} {'step p50 us':>12s} {'windows/s':>10s} "
+          f"{'size KB':>8s} {'accuracy':>9s} {'delta':>7s} {'agree':>7s}")
+    reference = None
+    with torch.no_grad(), tempfile.TemporaryDirectory() as tmp:
+        for fmt, m in models.items():
+            path = os.path.join(tmp, MODEL_FILES[fmt])
+            if fmt == "float":
+                torch.save(m.state_dict(), path)
+            else:
+                torch.jit.save(m, path)
+
+            p50, p95 = percentiles(m, x_one)
+            step50, _ = percentiles(m.step, x_step, h_step)
+            start = time.perf_counter()
+            pred = predict_all(m, dataset, test_idx, args.batch_size)
+            rate = len(test_idx) / (time.perf_counter() - start)
+            acc = float(np.mean(pred == y))
+            if reference is None:
+                reference = (pred, acc)
+            print(f"{fmt:12s} {p50:8.3f} / {p95:7.3f} {step50 * 1000:12.1f} {rate:10.0f} "
+                  f"{os.path.getsize(path) / 1024:8.1f} {acc:9.4f} {acc - reference[1]:+7.4f} "
+                  f"{np.mean(pred == reference[0]):7.4f}")
+
+
+if __name__ == "__main__":
+    main()
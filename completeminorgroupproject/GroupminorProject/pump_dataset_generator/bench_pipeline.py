@@ -0,0 +1,84 @@
+"""
+Benchmark: pump training pipeline on CSV vs the columnar format.
+
+Generates one dataset in memory, then times each stage for both formats:
+  write     generator output (CSV text vs per-column binary)
+  prepare   prepare_dataset.prepare (read + select + write CSV vs zero-copy projection)
+  windows   create_windows.load_series (parse CSV vs memory-map 5 columns)
+  train     columns train_aiml.py reads (parse CSV vs memory-map 7 columns)
+
+  python bench_pipeline.py --rows 1000000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from columnar import ColumnarWriter, read_table
+from create_windows import load_series
+from generate_level12_dataset import COLUMN_DTYPES, COLUMNS, generate_dataset
+from prepare_dataset import prepare
+
+TRAIN_COLUMNS = ["time", "current", "temperature", "vibration", "flow", "health", "label"]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - start
+
+
+def write_csv(df, path):
+    df.to_csv(path, index=False)
+
+
+def write_columnar(df, path):
+    with ColumnarWriter(path, {name: COLUMN_DTYPES[name] for name in COLUMNS}) as writer:
+        writer.write(df)
+
+
+def load_train_columns(path):
+    table = read_table(path, TRAIN_COLUMNS)
+    return pd.DataFrame({name: np.asarray(table[name]) for name in TRAIN_COLUMNS})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--dir", default=None, help="work directory (default: a temp dir, removed afterwards)")
+    args = parser.parse_args()
+
+    work = args.dir or tempfile.mkdtemp(prefix="pump_bench_")
+    os.makedirs(work, exist_ok=True)
+    cycles = args.rows // (9 * 120) + 1
+    print("Generating", args.rows, "rows in memory...")
+    df = generate_dataset(args.rows, cycles)
+
+    results = {}
+    try:
+        for fmt, ext, write in (("csv", ".csv", write_csv), ("columnar", ".cols", write_columnar)):
+            src = os.path.join(work, fmt + "_source" + ext)
+            times = {}
+            _, times["write"] = timed(write, df, src)
+            (model_path, _, _), times["prepare"] = timed(prepare, src, os.path.join(work, fmt + "_model"))
+            (features, labels, _), times["windows"] = timed(load_series, model_path)
+            _, times["train"] = timed(load_train_columns, src)
+            times["total"] = sum(times.values())
+            results[fmt] = times
+            assert features.shape == (args.rows, 4) and len(labels) == args.rows
+    finally:
+        if not args.dir:
+            shutil.rmtree(work, ignore_errors=True)
+
+    print("\nStage        CSV (s)   columnar (s)   speedup")
+    for stage in ["write", "prepare", "windows", "train", "total"]:
+        c, m = results["csv"][stage], results["columnar"][stage]
+        print(f"{stage:<10} {c:>9.3f}   {m:>12.4f}   {c / max(m, 1e-9):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
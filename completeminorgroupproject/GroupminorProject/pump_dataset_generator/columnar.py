@@ -0,0 +1,128 @@
+"""
+Columnar dataset format for large generated datasets.
+
+A dataset is a directory with one raw little-endian binary file per column
+plus meta.json:
+
+  LEVEL1_LEVEL2_PUMP_DATASET_IMPROVED.cols/
+    meta.json      {"rows": N, "columns": {"current": {"dtype": "<f4", "file": "current.bin"}, ...}}
+    current.bin    N float32 values
+    ...
+
+ColumnarWriter appends chunks as they are produced, so memory stays flat no
+matter how many rows are written. open_columnar() maps the columns with
+np.memmap (nothing is read until it is used). A column's "file" is relative to
+the dataset directory and may point into another dataset, which is how
+prepare_dataset.py selects columns without copying (project_columnar).
+
+Pipeline scripts pick stem.cols over stem.csv when it exists (dataset_path);
+set PUMP_DATA_FORMAT=csv to force CSV.
+"""
+import json
+import os
+
+import numpy as np
+
+META_FILE = "meta.json"
+
+
+class ColumnarWriter:
+    def __init__(self, path, dtypes):
+        """dtypes: ordered {column: numpy dtype}; values are cast on write."""
+        self.path = path
+        self.dtypes = {name: np.dtype(dt).newbyteorder("<") for name, dt in dtypes.items()}
+        self.rows = 0
+        os.makedirs(path, exist_ok=True)
+        self._files = {name: open(os.path.join(path, name + ".bin"), "wb") for name in self.dtypes}
+        self._write_meta(complete=False)
+
+    def write(self, chunk):
+        """Append a chunk: a DataFrame or {column: array}, all columns the same length."""
+        n = None
+        for name, dtype in self.dtypes.items():
+            values = np.ascontiguousarray(np.asarray(chunk[name]), dtype=dtype)
+            if n is None:
+                n = len(values)
+            elif len(values) != n:
+                raise ValueError("column " + name + " has " + str(len(values)) + " rows, expected " + str(n))
+            values.tofile(self._files[name])
+        self.rows += n or 0
+
+    def close(self, complete=True):
+        """Close the column files; meta.json is marked complete unless complete=False."""
+        for f in self._files.values():
+            f.close()
+        self._write_meta(complete=complete)
+
+    def _write_meta(self, complete):
+        write_meta(self.path, self.rows, {
+            name: {"dtype": dtype.str, "file": name + ".bin"} for name, dtype in self.dtypes.items()
+        }, complete)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # A failed run stays marked incomplete, so open_columnar() refuses it
+        self.close(complete=exc_type is None)
+
+
+def write_meta(path, rows, columns, complete=True):
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, META_FILE), "w") as f:
+        json.dump({"rows": rows, "complete": complete, "columns": columns}, f, indent=2)
+
+
+def read_meta(path):
+    with open(os.path.join(path, META_FILE)) as f:
+        return json.load(f)
+
+
+def is_columnar(path):
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+def open_columnar(path, columns=None):
+    """{column: read-only np.memmap} for the requested columns (default: all), in file order."""
+    meta = read_meta(path)
+    if not meta.get("complete", True):
+        raise ValueError(path + " is incomplete (the writer was not closed, or the run failed)")
+    rows = meta["rows"]
+    names = columns or list(meta["columns"])
+    out = {}
+    for name in names:
+        info = meta["columns"][name]
+        dtype = np.dtype(info["dtype"])
+        if rows == 0:
+            out[name] = np.empty(0, dtype=dtype)
+        else:
+            out[name] = np.memmap(os.path.join(path, info["file"]), dtype=dtype, mode="r", shape=(rows,))
+    return out
+
+
+def project_columnar(src, dst, columns):
+    """Zero-copy projection: a dataset at dst whose meta.json points at src's column files."""
+    meta = read_meta(src)
+    write_meta(dst, meta["rows"], {
+        name: {
+            "dtype": meta["columns"][name]["dtype"],
+            "file": os.path.relpath(os.path.join(src, meta["columns"][name]["file"]), dst),
+        }
+        for name in columns
+    })
+
+
+def dataset_path(stem):
+    """stem.cols when it exists (unless PUMP_DATA_FORMAT=csv), else stem.csv."""
+    if os.environ.get("PUMP_DATA_FORMAT", "auto") != "csv" and is_columnar(stem + ".cols"):
+        return stem + ".cols"
+    return stem + ".csv"
+
+
+def read_table(path, columns=None):
+    """{column: array} from a columnar directory (memmaps) or a CSV file (parsed)."""
+    if is_columnar(path):
+        return open_columnar(path, columns)
+    import pandas as pd
+    df = pd.read_csv(path, usecols=columns)
+    return {name: df[name].values for name in (columns or df.columns)}
@@ -1,28 +1,51 @@
 """
 STEP 3 — Convert data into time-windows (5 sec at 10 Hz = 50 samples).
 We train on behaviour over time, not single readings.
+Fleet datasets (pump_id column) are windowed per pump, so no window spans two pumps.
+Reads model_dataset.cols (memory-mapped, only the needed columns) when present,
+else model_dataset.csv.
+
+train_model.py windows the series on the fly (windowed.py) and does not need
+X.npy; this step only materializes X.npy / y.npy for other tools.
 """
 import numpy as np
-import pandas as pd
 import os
 
+from columnar import dataset_path, read_meta, is_columnar, read_table
+from windowed import WindowedDataset
+
 WINDOW = 50   # 5 seconds if sampling 10 Hz
+FEATURES = ["current", "temperature", "vibration", "flow"]
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
-df = pd.read_csv(os.path.join(script_dir, "model_dataset.csv"))
 
-features = df[["current", "temperature", "vibration", "flow"]].values
-labels = df["label"].values
 
-X = []
-y = []
-for i in range(len(features) - WINDOW):
-    X.append(features[i : i + WINDOW])
-    y.append(labels[i + WINDOW])
+def load_series(path):
+    """(features (N, 4) float32, labels (N,), [(start, stop) per pump]) from CSV or columnar."""
+    if is_columnar(path):
+        fleet = "pump_id" in read_meta(path)["columns"]
+    else:
+        with open(path) as f:
+            fleet = "pump_id" in f.readline().strip().split(",")
+    columns = FEATURES + ["label"] + (["pump_id"] if fleet else [])
+    table = read_table(path, columns)
+    features = np.column_stack([np.asarray(table[name], dtype=np.float32) for name in FEATURES])
+    labels = np.asarray(table["label"])
+    if fleet:
+        starts = np.flatnonzero(np.diff(table["pump_id"])) + 1
+        edges = [0] + starts.tolist() + [len(labels)]
+    else:
+        edges = [0, len(labels)]
+    return features, labels, list(zip(edges[:-1], edges[1:]))
+
+
+if __name__ == "__main__":
+    features, labels, pumps = load_series(dataset_path(os.path.join(script_dir, "model_dataset")))
+    dataset = WindowedDataset(features, labels, WINDOW, segments=pumps)
 
-X = np.array(X, dtype=np.float32)
-y = np.array(y, dtype=np.int64)
+    X = dataset.windows(np.arange(len(dataset)))
+    y = dataset.targets().astype(np.int64)
 
-np.save(os.path.join(script_dir, "X.npy"), X)
-np.save(os.path.join(script_dir, "y.npy"), y)
-print("Windows created: X", X.shape, "y", y.shape)
+    np.save(os.path.join(script_dir, "X.npy"), X)
+    np.save(os.path.join(script_dir, "y.npy"), y)
+    print("Windows created: X", X.shape, "y", y.shape)
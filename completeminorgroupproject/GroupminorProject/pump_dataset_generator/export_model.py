@@ -0,0 +1,123 @@
+"""
+STEP 4b — Export the trained GRU for serving without Python-level module dispatch.
+
+  pump_health_model.pth         float32 state dict (train_model.py)
+  pump_health_model_scripted.pt TorchScript (torch.jit.script), float32
+  pump_health_model_int8.pt     TorchScript of the dynamically quantized model
+                                (GRU + Linear weights int8, activations quantized per call)
+
+Dynamic quantization uses one scale per activation tensor, and the raw inputs
+differ by ~1000x (temperature ~100, flow ~0.1), which costs int8 ~13 points of
+accuracy. The int8 model therefore standardizes its inputs first, with the
+inverse folded into the GRU input weights (exact in float); the mean / std
+come from the training windows of --dataset only (the train_model.py split),
+so held-out windows do not leak into the scaling.
+
+realtime_predictor.py loads one of them via PUMP_MODEL_FORMAT=float|torchscript|int8.
+bench_export.py compares latency, throughput, size and accuracy.
+
+  python export_model.py [--model pump_health_model.pth] [--dataset model_dataset.cols]
+"""
+import argparse
+import copy
+import os
+import warnings
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from sklearn.model_selection import train_test_split
+
+from columnar import dataset_path
+from create_windows import WINDOW, load_series
+from model_pump_gru import MODEL_FILES, PumpGRU
+from windowed import WindowedDataset
+
+DEPRECATION_NOTICES = r".*torch\.(jit|ao\.quantization|quantize_per)"
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+class ScaledPumpGRU(nn.Module):
+    """PumpGRU on standardized inputs: (x - mean) / std, with w_ih * std and b_ih + w_ih @ mean folded in."""
+
+    def __init__(self, model, mean, std):
+        super().__init__()
+        folded = copy.deepcopy(model)
+        mean = torch.as_tensor(mean, dtype=torch.float32)
+        std = torch.as_tensor(std, dtype=torch.float32)
+        with torch.no_grad():
+            folded.gru.bias_ih_l0 += folded.gru.weight_ih_l0 @ mean
+            folded.gru.weight_ih_l0 *= std
+        self.gru, self.fc = folded.gru, folded.fc
+        self.register_buffer("mean", mean)
+        self.register_buffer("std", std)
+
+    def _scale(self, x):
+        return (x - self.mean) / self.std
+
+    def forward(self, x):
+        out, _ = self.gru(self._scale(x))
+        return self.fc(out[:, -1, :])
+
+    @torch.jit.export
+    def encode(self, x):
+        _, h = self.gru(self._scale(x))
+        return h[-1]
+
+    @torch.jit.export
+    def step(self, x, h):
+        _, h = self.gru(self._scale(x).unsqueeze(1), h.unsqueeze(0))
+        h = h[0]
+        return self.fc(h), h
+
+
+def load_float(path=os.path.join(script_dir, MODEL_FILES["float"])):
+    m = PumpGRU(input_size=4, hidden_size=32, num_classes=3)
+    m.load_state_dict(torch.load(path, map_location="cpu"))
+    return m.eval()
+
+
+def script_model(m):
+    return torch.jit.script(m)
+
+
+def split(dataset):
+    """(train_idx, test_idx) window indices, as train_model.py splits them."""
+    return train_test_split(np.arange(len(dataset)), test_size=0.2, random_state=42)
+
+
+def input_scaling(features, labels, pumps):
+    """Input (mean, std) over the training windows of a series."""
+    dataset = WindowedDataset(features, labels, WINDOW, segments=pumps)
+    return dataset.input_stats(split(dataset)[0])
+
+
+def quantize_model(m, mean, std):
+    """Dynamic int8 quantization (weights int8, activations quantized per call) on standardized inputs."""
+    std = np.maximum(std, 1e-6)
+    scaled = ScaledPumpGRU(m, mean, std).eval()
+    return torch.ao.quantization.quantize_dynamic(scaled, {nn.GRU, nn.Linear}, dtype=torch.qint8)
+
+
+def export(m, mean, std, out_dir=script_dir):
+    """Write the TorchScript and int8 files; mean / std is the int8 input scaling. Returns {format: path}."""
+    paths = {}
+    for fmt, model in (("torchscript", m), ("int8", quantize_model(m, mean, std))):
+        path = os.path.join(out_dir, MODEL_FILES[fmt])
+        torch.jit.save(script_model(model), path)
+        paths[fmt] = path
+    return paths
+
+
+if __name__ == "__main__":
+    warnings.filterwarnings("ignore", message=DEPRECATION_NOTICES)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=os.path.join(script_dir, MODEL_FILES["float"]))
+    parser.add_argument("--dataset", default=None, help="training series for the int8 input scaling "
+                                                        "(default: model_dataset .cols or .csv)")
+    args = parser.parse_args()
+    mean, std = input_scaling(*load_series(args.dataset or dataset_path(os.path.join(script_dir, "model_dataset"))))
+    for fmt, path in export(load_float(args.model), mean, std).items():
+        print(fmt, "->", path, "(" + str(os.path.getsize(path)) + " bytes)")
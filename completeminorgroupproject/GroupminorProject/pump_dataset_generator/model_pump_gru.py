@@ -1,9 +1,19 @@
 """
 GRU model for pump health: 4 inputs (current, temperature, vibration, flow) -> 3 classes.
 Used by train_model.py and realtime_predictor.py (no circular import).
+encode/step are exported for TorchScript and only call self.gru / self.fc, so
+scripted and dynamically quantized (int8) models support them too (export_model.py).
 """
+import torch
 import torch.nn as nn
 
+# Serialized model per serving format (PUMP_MODEL_FORMAT); the TorchScript files come from export_model.py
+MODEL_FILES = {
+    "float": "pump_health_model.pth",
+    "torchscript": "pump_health_model_scripted.pt",
+    "int8": "pump_health_model_int8.pt",
+}
+
 class PumpGRU(nn.Module):
     def __init__(self, input_size=4, hidden_size=32, num_classes=3):
         super().__init__()
@@ -14,3 +24,19 @@ class PumpGRU(nn.Module):
         out, _ = self.gru(x)
         out = out[:, -1, :]
         return self.fc(out)
+
+    @torch.jit.export
+    def encode(self, x):
+        """Run the GRU over x (batch, time, input) and return the last hidden state (batch, hidden)."""
+        _, h = self.gru(x)
+        return h[-1]
+
+    @torch.jit.export
+    def step(self, x, h):
+        """
+        Advance one timestep (a length-1 pass through self.gru).
+        x: (batch, input), h: (batch, hidden) -> (logits, new h).
+        """
+        _, h = self.gru(x.unsqueeze(1), h.unsqueeze(0))
+        h = h[0]
+        return self.fc(h), h
@@ -1,16 +1,48 @@
 """
 STEP 2 — Prepare dataset for training: keep only sensor inputs + label.
 Reads LEVEL1_LEVEL2_PUMP_DATASET_IMPROVED.csv -> model_dataset.csv
+A columnar source (LEVEL1_LEVEL2_PUMP_DATASET_IMPROVED.cols, from
+generate_level12_dataset.py --format columnar) becomes model_dataset.cols: a
+zero-copy projection whose meta.json points at the source column files.
 """
 import pandas as pd
 import os
+import shutil
+
+from columnar import dataset_path, is_columnar, project_columnar, read_meta
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
-in_path = os.path.join(script_dir, "LEVEL1_LEVEL2_PUMP_DATASET_IMPROVED.csv")
-out_path = os.path.join(script_dir, "model_dataset.csv")
-
-df = pd.read_csv(in_path)
-df = df[["time", "current", "temperature", "vibration", "flow", "label"]]
-df.to_csv(out_path, index=False)
-print("Dataset ready:", out_path)
-print("Rows:", len(df), "Columns:", list(df.columns))
+in_stem = os.path.join(script_dir, "LEVEL1_LEVEL2_PUMP_DATASET_IMPROVED")
+out_stem = os.path.join(script_dir, "model_dataset")
+
+COLUMNS = ["time", "current", "temperature", "vibration", "flow", "label"]
+
+
+def prepare(in_path, out_stem):
+    """Select the training columns; returns (output path, rows, columns)."""
+    if is_columnar(in_path):
+        meta = read_meta(in_path)
+        columns = (["pump_id"] if "pump_id" in meta["columns"] else []) + COLUMNS
+        out_path = out_stem + ".cols"
+        project_columnar(in_path, out_path, columns)
+        stale = out_stem + ".csv"
+        if os.path.exists(stale):
+            os.remove(stale)
+        return out_path, meta["rows"], columns
+
+    df = pd.read_csv(in_path)
+    columns = COLUMNS
+    if "pump_id" in df.columns:  # fleet dataset (generate_level12_dataset.py --pumps N)
+        columns = ["pump_id"] + columns
+    df = df[columns]
+    out_path = out_stem + ".csv"
+    df.to_csv(out_path, index=False)
+    if is_columnar(out_stem + ".cols"):
+        shutil.rmtree(out_stem + ".cols")
+    return out_path, len(df), columns
+
+
+if __name__ == "__main__":
+    out_path, rows, columns = prepare(dataset_path(in_stem), out_stem)
+    print("Dataset ready:", out_path)
+    print("Rows:", rows, "Columns:", columns)
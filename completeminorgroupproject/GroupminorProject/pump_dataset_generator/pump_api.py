@@ -1,30 +1,45 @@
 """
 Pump Health API — Real-time health from current, temperature, vibration, flow.
 For dashboard: POST /predict returns condition + health_score.
+Each pump is tracked by "device_id" in the payload (default: "default").
+POST a JSON list of readings to score one tick from many pumps in a single GRU pass.
+Concurrent requests are micro-batched into one GRU pass (see batch_scheduler.py).
+The model loads in the background; GET /health reports model_status.
+POST /predict_stream takes a chunked NDJSON body (one reading per line) and
+streams one NDJSON result per reading back, in order (see stream_client.py).
+Lines are scored as soon as they arrive: whatever has been received when
+scoring is free again goes through in one batch (at most STREAM_CHUNK lines).
+A line that is not a reading, or a batch that fails (queue full, timeout,
+model error), gets error lines instead of ending the stream.
 """
 import os
-from flask import Flask, request, jsonify
+import json
+import queue
+import threading
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-from collections import deque
 
-from model_pump_gru import PumpGRU
-from realtime_predictor import predict, get_health_score, control_recommendation
+import realtime_predictor
+from realtime_predictor import predict_batch, get_health_score, control_recommendation, DEFAULT_DEVICE
+from batch_scheduler import MicroBatcher, SchedulerBusy
 
 app = Flask(__name__)
 CORS(app)
 
-import torch
-script_dir = os.path.dirname(os.path.abspath(__file__))
-model_path = os.path.join(script_dir, "pump_health_model.pth")
+# GRU is loaded (once) and warmed up in the background; /predict answers
+# "Model loading..." until it is ready.
+realtime_predictor.load_model_async()
 
-model = None
-try:
-    model = PumpGRU(input_size=4, hidden_size=32, num_classes=3)
-    model.load_state_dict(torch.load(model_path, map_location="cpu"))
-    model.eval()
-    print("Pump health model loaded")
-except Exception as e:
-    print("Pump model not loaded:", e)
+# Upper bound on the lines of an NDJSON stream scored in one batch
+STREAM_CHUNK = int(os.environ.get("PUMP_STREAM_CHUNK", 256))
+
+batcher = MicroBatcher(
+    predict_batch,
+    window_ms=float(os.environ.get("PUMP_BATCH_WINDOW_MS", 2)),
+    max_batch=int(os.environ.get("PUMP_BATCH_MAX", 256)),
+    max_queue=int(os.environ.get("PUMP_QUEUE_MAX", 4096)),
+    slo_ms=float(os.environ.get("PUMP_LATENCY_SLO_MS", 50)),
+)
 
 
 def _get_sensors(data):
@@ -35,6 +50,114 @@ def _get_sensors(data):
     return float(c), float(t), float(v), float(f)
 
 
+def _get_device(data):
+    return str(data.get("device_id") or DEFAULT_DEVICE)
+
+
+def _result(health_class, label, device_id):
+    if label is None:
+        return {
+            "device_id": device_id,
+            "condition": "Collecting data...",
+            "health_score": 100,
+            "status": "collecting..."
+        }
+    score = get_health_score(label)
+    action, recommendation = control_recommendation(health_class)
+    return {
+        "device_id": device_id,
+        "condition": health_class,
+        "health_score": score,
+        "label": label,
+        "action": action,
+        "recommendation": recommendation,
+    }
+
+
+def _not_ready_result():
+    loading = realtime_predictor.model_status["status"] in ("not_loaded", "loading")
+    return {"condition": "Model loading..." if loading else "Model not loaded", "health_score": 50}
+
+
+def score_items(items):
+    """Reading dicts -> result dicts through the micro-batcher (one GRU pass per batch)."""
+    if not realtime_predictor.model_ready():
+        return [_not_ready_result() for _ in items]
+    readings = [(_get_device(item),) + _get_sensors(item) for item in items]
+    outputs = batcher.predict(readings)
+    return [_result(cls, label, r[0]) for r, (cls, label) in zip(readings, outputs)]
+
+
+_INVALID_JSON = object()
+
+
+def parse_lines(lines):
+    """NDJSON lines -> one parsed value per non-empty line (_INVALID_JSON where it is not JSON)."""
+    items = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError:
+            items.append(_INVALID_JSON)
+    return items
+
+
+def item_error(item):
+    """Why item cannot be scored, or None for a valid reading."""
+    if item is _INVALID_JSON:
+        return "invalid JSON"
+    if not isinstance(item, dict):
+        return "reading must be a JSON object"
+    try:
+        _get_sensors(item)
+    except (TypeError, ValueError):
+        return "sensor values must be numbers"
+    return None
+
+
+def split_items(items):
+    """-> (valid readings, one result slot per item: an error dict, or None where a valid reading goes)."""
+    valid, results = [], []
+    for item in items:
+        error = item_error(item)
+        if error is None:
+            valid.append(item)
+            results.append(None)
+        else:
+            results.append({"error": error})
+    return valid, results
+
+
+def merge_results(results, scored):
+    """Fill the None slots of split_items() with the results of its valid readings, in order."""
+    scored = iter(scored)
+    return [r if r is not None else next(scored) for r in results]
+
+
+def error_results(items, error):
+    """One error result per reading of a batch that failed (queue full, timeout, model error)."""
+    return [{"error": str(error), "device_id": _get_device(item)} for item in items]
+
+
+def score_checked(items):
+    """Any JSON values -> one result per item; invalid items and failed batches become error results."""
+    valid, results = split_items(items)
+    if valid:
+        try:
+            scored = score_items(valid)
+        except Exception as e:
+            scored = error_results(valid, e)
+        results = merge_results(results, scored)
+    return results
+
+
+def ndjson(results):
+    return "".join(json.dumps(r) + "\n" for r in results)
+
+
 @app.route("/")
 def index():
     """Root route so GET / does not return 404. Dashboard runs on Next.js (port 3000)."""
@@ -42,48 +165,87 @@ def index():
         "service": "Pump Health API",
         "model": "GRU (LEVEL1_LEVEL2_PUMP_DATASET_IMPROVED)",
         "status": "running",
-        "endpoints": {"health": "GET /health", "predict": "POST /predict", "reset": "POST /reset"},
+        "endpoints": {
+            "health": "GET /health",
+            "predict": "POST /predict",
+            "predict_stream": "POST /predict_stream (NDJSON)",
+            "reset": "POST /reset",
+        },
         "dashboard": "Use Next.js app on port 3000; backend (5000) + ML API (5001) call this API for health.",
     })
 
 
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "running", "pump_model_loaded": model is not None})
+    return jsonify({
+        "status": "running",
+        "pump_model_loaded": realtime_predictor.model_ready(),
+        "model_status": realtime_predictor.model_status,
+        "batching": batcher.stats(),
+    })
 
 
 @app.route("/predict", methods=["POST"])
 def api_predict():
-    if model is None:
-        return jsonify({"condition": "Model not loaded", "health_score": 50})
+    if not realtime_predictor.model_ready():
+        return jsonify(_not_ready_result())
     try:
         data = request.json or {}
-        c, t, v, f = _get_sensors(data)
-        health_class, label = predict(c, t, v, f)
-        if label is None:
-            return jsonify({
-                "condition": "Collecting data...",
-                "health_score": 100,
-                "status": "collecting..."
-            })
-        score = get_health_score(label)
-        action, recommendation = control_recommendation(health_class)
-        return jsonify({
-            "condition": health_class,
-            "health_score": score,
-            "label": label,
-            "action": action,
-            "recommendation": recommendation,
-        })
+        batch = isinstance(data, list)
+        results = score_items(data if batch else [data])
+        return jsonify(results if batch else results[0])
+    except SchedulerBusy as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+_END = object()
+
+
+@app.route("/predict_stream", methods=["POST"])
+def predict_stream():
+    """Long-lived NDJSON stream: one result line per reading, written as soon as
+    it is scored. A reader thread queues incoming lines; each batch takes the
+    lines received so far (up to STREAM_CHUNK), so a single 10 Hz device is
+    answered per reading and a busy stream is scored in larger batches."""
+    stream = request.stream
+    lines = queue.Queue()
+
+    def read():
+        try:
+            for line in stream:
+                lines.put(line)
+        finally:
+            lines.put(_END)
+
+    def generate():
+        threading.Thread(target=read, name="pump-stream-reader", daemon=True).start()
+        done = False
+        while not done:
+            batch = [lines.get()]
+            while len(batch) < STREAM_CHUNK and batch[-1] is not _END:
+                try:
+                    batch.append(lines.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is _END:
+                done = True
+                batch.pop()
+            results = score_checked(parse_lines(batch))
+            if results:
+                yield ndjson(results)
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
 @app.route("/reset", methods=["POST"])
 def reset():
     from realtime_predictor import reset_buffer
-    reset_buffer()
-    return jsonify({"status": "buffer cleared"})
+    data = request.get_json(silent=True) or {}
+    device_id = data.get("device_id")
+    reset_buffer(device_id)
+    return jsonify({"status": "buffer cleared", "device_id": device_id})
 
 
 if __name__ == "__main__":
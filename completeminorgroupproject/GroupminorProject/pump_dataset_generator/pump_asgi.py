@@ -0,0 +1,188 @@
+"""
+Pump Health API — async (ASGI) serving mode, same routes as pump_api.py.
+Requests stay on the event loop; GRU inference goes through the same
+micro-batching scheduler (its worker thread), so the loop never blocks.
+
+Streaming ingest (one long-lived connection per device or gateway):
+  WS   /stream          send a JSON reading, a JSON list, or NDJSON lines per
+                        message; receive a JSON list of results per message
+                        (an error result for each invalid reading or failed batch)
+  POST /predict_stream  chunked NDJSON in, NDJSON results out
+
+Run: python pump_asgi.py   (or: uvicorn pump_asgi:app --port 5003)
+Needs: pip install starlette uvicorn websockets
+"""
+import asyncio
+import contextlib
+import json
+import os
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocketDisconnect
+
+import realtime_predictor
+from pump_api import (batcher, _INVALID_JSON, _get_device, _get_sensors, _result, _not_ready_result, STREAM_CHUNK,
+                      error_results, merge_results, ndjson, parse_lines, split_items)
+from batch_scheduler import SchedulerBusy
+
+
+async def index(request):
+    return JSONResponse({
+        "service": "Pump Health API (ASGI)",
+        "model": "GRU (LEVEL1_LEVEL2_PUMP_DATASET_IMPROVED)",
+        "status": "running",
+        "endpoints": {
+            "health": "GET /health",
+            "predict": "POST /predict",
+            "predict_stream": "POST /predict_stream (NDJSON)",
+            "stream": "WS /stream",
+            "reset": "POST /reset",
+        },
+    })
+
+
+async def health(request):
+    return JSONResponse({
+        "status": "running",
+        "pump_model_loaded": realtime_predictor.model_ready(),
+        "model_status": realtime_predictor.model_status,
+        "batching": batcher.stats(),
+        "server": "asgi",
+    })
+
+
+async def score_items(items):
+    """Reading dicts -> result dicts via the micro-batcher, without blocking the loop."""
+    if not realtime_predictor.model_ready():
+        return [_not_ready_result() for _ in items]
+    readings = [(_get_device(item),) + _get_sensors(item) for item in items]
+    outputs = await asyncio.wrap_future(batcher.submit(readings))
+    return [_result(cls, label, r[0]) for r, (cls, label) in zip(readings, outputs)]
+
+
+async def score_checked(items):
+    """Any JSON values -> one result per item, in batches of at most STREAM_CHUNK;
+    invalid items and failed batches become error results."""
+    valid, results = split_items(items)
+    scored = []
+    for i in range(0, len(valid), STREAM_CHUNK):
+        part = valid[i:i + STREAM_CHUNK]
+        try:
+            scored += await score_items(part)
+        except Exception as e:
+            scored += error_results(part, e)
+    return merge_results(results, scored)
+
+
+def _parse_message(text):
+    """One WebSocket message: a JSON list, or NDJSON lines (a single JSON object is one line)."""
+    text = text.strip()
+    if text.startswith("["):
+        try:
+            return json.loads(text)
+        except ValueError:
+            return [_INVALID_JSON]
+    return parse_lines(text.splitlines())
+
+
+async def api_predict(request):
+    if not realtime_predictor.model_ready():
+        return JSONResponse(_not_ready_result())
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = {}
+        data = data or {}
+        batch = isinstance(data, list)
+        results = await score_items(data if batch else [data])
+        return JSONResponse(results if batch else results[0])
+    except SchedulerBusy as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse that leaves receive() to the request body reader.
+    The stock one listens for disconnects on receive() while streaming, which
+    would swallow body chunks that are still arriving."""
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+async def predict_stream(request):
+    """Chunked NDJSON in, NDJSON out. The complete lines of each received body
+    chunk are scored as soon as it arrives (in batches of at most STREAM_CHUNK)."""
+    async def score(lines):
+        return ndjson(await score_checked(parse_lines(lines)))
+
+    async def generate():
+        pending = b""
+        async for data in request.stream():
+            pending += data
+            *lines, pending = pending.split(b"\n")
+            if lines:
+                out = await score(lines)
+                if out:
+                    yield out
+        if pending.strip():
+            yield await score([pending])
+
+    return DuplexStreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+async def stream(websocket):
+    """Long-lived WebSocket: each message is answered with a JSON list on the same
+    connection, one result per reading (an error result for an invalid one)."""
+    await websocket.accept()
+    try:
+        while True:
+            results = await score_checked(_parse_message(await websocket.receive_text()))
+            await websocket.send_text(json.dumps(results))
+    except WebSocketDisconnect:
+        pass
+
+
+async def reset(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    device_id = (data or {}).get("device_id")
+    realtime_predictor.reset_buffer(device_id)
+    return JSONResponse({"status": "buffer cleared", "device_id": device_id})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    realtime_predictor.load_model_async()
+    yield
+
+
+routes = [
+    Route("/", index, methods=["GET"]),
+    Route("/health", health, methods=["GET"]),
+    Route("/predict", api_predict, methods=["POST"]),
+    Route("/predict_stream", predict_stream, methods=["POST"]),
+    Route("/reset", reset, methods=["POST"]),
+    WebSocketRoute("/stream", stream),
+]
+
+app = Starlette(
+    routes=routes,
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan,
+)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    port = int(os.environ.get("PORT", 5003))
+    print("Pump Health API (ASGI) on http://localhost:" + str(port))
+    uvicorn.run(app, host="0.0.0.0", port=port, log_level="warning")
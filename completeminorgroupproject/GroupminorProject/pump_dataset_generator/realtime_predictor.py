@@ -1,36 +1,236 @@
 """
 STEP 5 — Real-time prediction engine.
-Buffer 50 samples (current, temp, vib, flow) -> GRU -> Healthy / Warning / Fault.
+Buffer 50 samples (current, temp, vib, flow) per pump -> GRU -> Healthy / Warning / Fault.
+Each pump (device_id) keeps its own window; readings from many pumps can be
+scored together in one batched GRU forward pass with predict_batch().
+
+Incremental mode (PUMP_INCREMENTAL=1 or incremental=True) keeps WINDOW
+staggered GRU hidden states per pump, one per window start: each reading
+resets the oldest to zero (a new window starts) and advances all of them in
+one batched step() call, and the state that has now seen exactly WINDOW
+samples is the full-window state. So each reading still costs O(WINDOW) GRU
+work, one batched step over WINDOW rows, not O(1); it replaces WINDOW
+sequential steps (0.24 s vs 1.49 s per 1000 readings on one core) and gives
+the same classification as the full-window path. A single carried state
+would be O(1) but drifts: its logits were up to ~4.5 off with this model.
+verify_incremental() checks the agreement against MIN_AGREEMENT: float and
+torchscript agreed 100% (batched vs single-row matmuls round differently,
+so a near-tie may flip); int8 quantizes activations per call with a scale
+taken from the whole batch, so even its full-window path changes with batch
+composition, and the incremental path agreed 99.7-99.8%.
+A full-window call for a device drops its staggered states; the next
+incremental call rebuilds them from the device's window.
+
+At most PUMP_MAX_DEVICES (10000) devices are kept; a new device beyond that
+evicts the least recently seen one (its window and states), which then starts
+collecting again if it comes back.
+
+The model is loaded once, on first use or in the background via
+load_model_async(), and warmed up with a synthetic window before it is
+marked ready (model_status).
+
+PUMP_MODEL_FORMAT picks the model file: float (pump_health_model.pth, eager),
+torchscript or int8 (TorchScript files from export_model.py). All three
+support both the full-window and incremental paths.
 """
 import torch
 import numpy as np
 import os
-from collections import deque
+import threading
+import time
+from collections import OrderedDict, deque
 
-from model_pump_gru import PumpGRU
+from model_pump_gru import MODEL_FILES, PumpGRU
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
-model_path = os.path.join(script_dir, "pump_health_model.pth")
-
-model = PumpGRU(input_size=4, hidden_size=32, num_classes=3)
-model.load_state_dict(torch.load(model_path, map_location="cpu"))
-model.eval()
+MODEL_FORMAT = os.environ.get("PUMP_MODEL_FORMAT", "float")
+model_path = os.path.join(script_dir, MODEL_FILES.get(MODEL_FORMAT, MODEL_FILES["float"]))
 
 WINDOW = 50
-buffer = deque(maxlen=WINDOW)
 LABELS = ["Healthy", "Warning", "Fault"]
+DEFAULT_DEVICE = "default"
+INCREMENTAL = os.environ.get("PUMP_INCREMENTAL", "0") == "1"
+# Most devices kept in memory; the least recently seen one is dropped beyond that
+MAX_DEVICES = int(os.environ.get("PUMP_MAX_DEVICES", 10000))
+# verify_incremental() tolerance (see module docstring)
+MIN_AGREEMENT = 0.99 if MODEL_FORMAT == "int8" else 0.999
+
+# device_id -> deque of the last WINDOW readings, least recently seen first
+buffers = OrderedDict()
+# device_id -> [staggered hidden states (WINDOW, hidden), samples seen] (incremental mode);
+# row n % WINDOW holds the window that starts at sample n
+hidden = {}
+_lock = threading.Lock()
+
+model = None
+model_status = {"status": "not_loaded", "error": None, "load_seconds": None, "format": MODEL_FORMAT}
+_load_lock = threading.Lock()
+
+
+def _warm_up(m):
+    """Run each inference path once on synthetic input so the first request skips allocation costs."""
+    with torch.no_grad():
+        x = torch.zeros(1, WINDOW, 4)
+        m(x)
+        m.encode(x)
+        m.step(x[0], torch.zeros(WINDOW, m.gru.hidden_size))
+
+
+def load_model():
+    """Load and warm up the GRU once (thread-safe). Returns the model, or None if loading failed."""
+    global model
+    with _load_lock:
+        if model is not None or model_status["status"] == "failed":
+            return model
+        model_status["status"] = "loading"
+        start = time.perf_counter()
+        try:
+            if MODEL_FORMAT not in MODEL_FILES:
+                raise ValueError("PUMP_MODEL_FORMAT must be one of " + ", ".join(MODEL_FILES))
+            if MODEL_FORMAT == "float":
+                m = PumpGRU(input_size=4, hidden_size=32, num_classes=3)
+                m.load_state_dict(torch.load(model_path, map_location="cpu"))
+            else:
+                m = torch.jit.load(model_path, map_location="cpu")
+            m.eval()
+            _warm_up(m)
+        except Exception as e:
+            model_status.update(status="failed", error=str(e))
+            print("Pump model not loaded:", e)
+            return None
+        model = m
+        model_status.update(status="ready", load_seconds=round(time.perf_counter() - start, 3))
+        print("Pump health model loaded")
+    return model
+
+
+def load_model_async():
+    """Start loading in a background thread (no-op if already loading or loaded)."""
+    if model_status["status"] == "not_loaded":
+        threading.Thread(target=load_model, name="pump-model-load", daemon=True).start()
+
+
+def model_ready():
+    return model is not None
+
+
+def _get_model():
+    m = model if model is not None else load_model()
+    if m is None:
+        raise RuntimeError("Pump model not loaded: " + str(model_status["error"]))
+    return m
 
 
-def predict(current, temp, vib, flow):
-    """Add one reading and return health class when buffer is full."""
-    buffer.append([float(current), float(temp), float(vib), float(flow)])
-    if len(buffer) < WINDOW:
-        return "Collecting data...", None
-    x = torch.tensor([list(buffer)], dtype=torch.float32)
+def _window(device_id):
+    buf = buffers.get(device_id)
+    if buf is None:
+        buf = buffers[device_id] = deque(maxlen=WINDOW)
+        while len(buffers) > MAX_DEVICES:
+            evicted, _ = buffers.popitem(last=False)
+            hidden.pop(evicted, None)
+    else:
+        buffers.move_to_end(device_id)
+    return buf
+
+
+def _predict_full(readings):
+    m = _get_model()
+    results = [("Collecting data...", None)] * len(readings)
+    ready, windows = [], []
+    with _lock:
+        for i, (device_id, current, temp, vib, flow) in enumerate(readings):
+            buf = _window(device_id)
+            buf.append((float(current), float(temp), float(vib), float(flow)))
+            hidden.pop(device_id, None)  # stale now; rebuilt from buf if the device goes incremental
+            if len(buf) == WINDOW:
+                # Snapshot now so a second reading from the same device in
+                # this tick gets its own (shifted) window.
+                ready.append(i)
+                windows.append(np.array(buf, dtype=np.float32))
+    if not ready:
+        return results
+    x = torch.from_numpy(np.stack(windows))
+    with torch.no_grad():
+        out = m(x)
+        classes = torch.argmax(out, dim=1).tolist()
+    for i, cls in zip(ready, classes):
+        results[i] = (LABELS[cls], cls)
+    return results
+
+
+def _new_state(m, buf):
+    """Staggered states for a device whose window already holds buf (replayed once, oldest first)."""
+    state = [torch.zeros(WINDOW, m.gru.hidden_size), 0]
+    with torch.no_grad():
+        for x in buf:
+            state[0][state[1] % WINDOW] = 0.0
+            _, state[0] = m.step(torch.tensor([x], dtype=torch.float32).repeat(WINDOW, 1), state[0])
+            state[1] += 1
+    return state
+
+
+def _step_round(m, readings, idx, results):
+    """One reading per device: advance every device's staggered states in one step() call."""
+    states, xs = [], []
+    for i in idx:
+        device_id, current, temp, vib, flow = readings[i]
+        x = (float(current), float(temp), float(vib), float(flow))
+        buf = _window(device_id)
+        state = hidden.get(device_id)
+        if state is None:
+            state = hidden[device_id] = _new_state(m, buf)
+        buf.append(x)
+        state[0][state[1] % WINDOW] = 0.0  # the window starting at this sample
+        states.append(state)
+        xs.append(x)
+
     with torch.no_grad():
-        out = model(x)
-        cls = torch.argmax(out, dim=1).item()
-    return LABELS[cls], cls
+        x = torch.tensor(xs, dtype=torch.float32).repeat_interleave(WINDOW, dim=0)
+        logits, h = m.step(x, torch.cat([state[0] for state in states]))
+    for k, (i, state) in enumerate(zip(idx, states)):
+        state[0] = h[k * WINDOW:(k + 1) * WINDOW]
+        state[1] += 1
+        if state[1] >= WINDOW:
+            # The window that started WINDOW - 1 samples ago is complete
+            cls = int(torch.argmax(logits[k * WINDOW + state[1] % WINDOW]))
+            results[i] = (LABELS[cls], cls)
+
+
+def _predict_incremental(readings):
+    m = _get_model()
+    results = [("Collecting data...", None)] * len(readings)
+    # A device that appears k times in this tick is stepped in rounds 0..k-1,
+    # so its readings are folded in arrival order.
+    rounds, seen = [], {}
+    for i, r in enumerate(readings):
+        k = seen.get(r[0], 0)
+        seen[r[0]] = k + 1
+        if k == len(rounds):
+            rounds.append([])
+        rounds[k].append(i)
+    with _lock:
+        for idx in rounds:
+            _step_round(m, readings, idx, results)
+    return results
+
+
+def predict_batch(readings, incremental=None):
+    """
+    Add readings from one tick and score every full window in one GRU pass.
+    readings: list of (device_id, current, temp, vib, flow).
+    Returns a list of (health_class, label) in the same order; label is None
+    while that device is still collecting its first WINDOW samples.
+    """
+    if incremental is None:
+        incremental = INCREMENTAL
+    if incremental:
+        return _predict_incremental(readings)
+    return _predict_full(readings)
+
+
+def predict(current, temp, vib, flow, device_id=DEFAULT_DEVICE, incremental=None):
+    """Add one reading for a device and return health class when its buffer is full."""
+    return predict_batch([(device_id, current, temp, vib, flow)], incremental)[0]
 
 
 def get_health_score(label_class):
@@ -42,8 +242,43 @@ def get_health_score(label_class):
     return 20
 
 
-def reset_buffer():
-    buffer.clear()
+def reset_buffer(device_id=None):
+    """Clear one device's window, or every device when device_id is None."""
+    with _lock:
+        if device_id is None:
+            buffers.clear()
+            hidden.clear()
+        else:
+            buffers.pop(device_id, None)
+            hidden.pop(device_id, None)
+
+
+def verify_incremental(samples, min_agreement=None):
+    """
+    Stream samples (N, 4) through both paths and compare.
+    Returns (classification agreement 0-1, windows compared); raises
+    AssertionError below min_agreement (default MIN_AGREEMENT). In float the
+    paths differ only by rounding (batched vs single-row GRU matmuls), so
+    only an exact logit tie could flip a class.
+    """
+    if min_agreement is None:
+        min_agreement = MIN_AGREEMENT
+    full_id, inc_id = "__verify_full__", "__verify_inc__"
+    reset_buffer(full_id)
+    reset_buffer(inc_id)
+    same = total = 0
+    for c, t, v, f in samples:
+        _, a = predict(c, t, v, f, device_id=full_id, incremental=False)
+        _, b = predict(c, t, v, f, device_id=inc_id, incremental=True)
+        if a is not None:
+            total += 1
+            same += int(a == b)
+    reset_buffer(full_id)
+    reset_buffer(inc_id)
+    agreement = same / total if total else 1.0
+    assert agreement >= min_agreement, \
+        "incremental agreement %.4f < %.4f over %d windows" % (agreement, min_agreement, total)
+    return agreement, total
 
 
 # STEP 7 — Control logic (use in your control layer)
@@ -63,3 +298,11 @@ if __name__ == "__main__":
     for _ in range(50):
         out, cls = predict(1.8, 42, 1.1, 0.12)
     print("Prediction:", out, "| Recommendation:", control_recommendation(out))
+
+    # Incremental vs full-window check on real data when available
+    data_path = os.path.join(script_dir, "model_dataset.csv")
+    if os.path.exists(data_path):
+        import pandas as pd
+        samples = pd.read_csv(data_path, nrows=5000)[["current", "temperature", "vibration", "flow"]].values
+        agree, n = verify_incremental(samples)
+        print("Incremental agreement:", round(agree * 100, 2), "% over", n, "windows")
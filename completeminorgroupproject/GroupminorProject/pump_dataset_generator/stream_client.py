@@ -0,0 +1,95 @@
+"""
+Streaming client for the Pump Health API — replays the dataset as live sensor
+streams over one persistent connection and reports sustained readings/s.
+
+  python stream_client.py --mode ws     --url ws://localhost:5003/stream       (pump_asgi.py)
+  python stream_client.py --mode ndjson --url http://localhost:5003/predict_stream
+
+--devices N spreads consecutive rows over N pumps (a 10 Hz gateway with N pumps
+sends N readings per tick); --chunk is the number of readings per message.
+Needs: pip install websockets httpx
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import pandas as pd
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+COLUMNS = ["current", "temperature", "vibration", "flow"]
+
+
+def load_readings(rows, devices):
+    path = os.path.join(script_dir, "LEVEL1_LEVEL2_PUMP_DATASET_IMPROVED.csv")
+    if not os.path.exists(path):
+        path = os.path.join(script_dir, "model_dataset.csv")
+    df = pd.read_csv(path, nrows=rows)[COLUMNS]
+    return [
+        {"device_id": "pump-" + str(i % devices), "current": c, "temperature": t, "vibration": v, "flow": f}
+        for i, (c, t, v, f) in enumerate(df.itertuples(index=False))
+    ]
+
+
+def chunks(readings, size):
+    for i in range(0, len(readings), size):
+        yield readings[i:i + size]
+
+
+async def run_ws(url, readings, size):
+    import websockets
+
+    results = []
+    async with websockets.connect(url, max_size=None) as ws:
+        for chunk in chunks(readings, size):
+            await ws.send("\n".join(json.dumps(r) for r in chunk))
+            results.extend(json.loads(await ws.recv()))
+    return results
+
+
+async def run_ndjson(url, readings, size):
+    import httpx
+
+    async def body():
+        for chunk in chunks(readings, size):
+            yield "".join(json.dumps(r) + "\n" for r in chunk).encode()
+
+    results = []
+    async with httpx.AsyncClient(timeout=None) as client:
+        async with client.stream("POST", url, content=body(),
+                                 headers={"Content-Type": "application/x-ndjson"}) as r:
+            async for line in r.aiter_lines():
+                if line:
+                    results.append(json.loads(line))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["ws", "ndjson"], default="ws")
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--devices", type=int, default=20)
+    parser.add_argument("--chunk", type=int, default=20, help="readings per message")
+    args = parser.parse_args()
+
+    url = args.url or ("ws://localhost:5003/stream" if args.mode == "ws"
+                       else "http://localhost:5003/predict_stream")
+    readings = load_readings(args.rows, args.devices)
+    run = run_ws if args.mode == "ws" else run_ndjson
+
+    start = time.perf_counter()
+    results = asyncio.run(run(url, readings, args.chunk))
+    elapsed = time.perf_counter() - start
+
+    scored = sum(1 for r in results if r.get("label") is not None)
+    errors = sum(1 for r in results if "error" in r)
+    print("Mode:", args.mode, "| URL:", url)
+    print("Readings:", len(readings), "| results:", len(results), "| scored:", scored, "| errors:", errors)
+    print("Sustained:", round(len(results) / elapsed, 1), "readings/s over", round(elapsed, 2), "s")
+    print("Equivalent 10 Hz pumps:", int(len(results) / elapsed / 10))
+
+
+if __name__ == "__main__":
+    main()
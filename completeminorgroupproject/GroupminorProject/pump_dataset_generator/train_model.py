@@ -1,55 +1,218 @@
 """
 STEP 4 — Train the GRU model (main AI). Saves pump_health_model.pth
+
+Windows are cut on the fly from model_dataset (.cols or .csv) with
+windowed.WindowedDataset, so memory scales with the raw series rather than
+with X.npy.
+
+Mini-batch training (default): shuffled batches of --batch-size windows, one
+optimizer step per batch, built by --workers DataLoader processes. The
+workers are started once and read the series from shared memory, so under
+spawn/forkserver they do not each get a pickled copy. The order is seeded per
+epoch from --seed, which the checkpoint records and --resume restores, so a
+resumed run sees the same batches. --batch-size 0
+keeps the old full-batch mode (one step per epoch, gradient accumulated over
+chunks of PUMP_TRAIN_CHUNK windows).
+
+  python train_model.py --batch-size 256 --epochs 5 --workers 2 --threads 4
+  python train_model.py --resume          # continue from pump_health_checkpoint.pt
+
+Env: PUMP_WINDOW (50), PUMP_WINDOW_STRIDE (1), PUMP_LABEL_HORIZON (1),
+     PUMP_TRAIN_CHUNK (1024)
 """
+import argparse
+import os
+import time
+
+import numpy as np
 import torch
 import torch.nn as nn
-import numpy as np
-import os
+from torch.utils.data import BatchSampler, DataLoader, SubsetRandomSampler
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 
+from columnar import dataset_path
+from create_windows import WINDOW, load_series
 from model_pump_gru import PumpGRU
+from windowed import WindowedDataset
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
-X = np.load(os.path.join(script_dir, "X.npy"))
-y = np.load(os.path.join(script_dir, "y.npy"))
-
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-X_train = torch.tensor(X_train, dtype=torch.float32)
-y_train = torch.tensor(y_train, dtype=torch.long)
-X_test = torch.tensor(X_test, dtype=torch.float32)
-y_test = torch.tensor(y_test, dtype=torch.long)
-
-model = PumpGRU(input_size=4, hidden_size=32, num_classes=3)
-# Class weights to handle imbalance (Healthy/Warning rarer in long runs)
-class_counts = np.bincount(y_train.numpy(), minlength=3)
-weights = 1.0 / (class_counts + 1)
-weights = weights / weights.sum() * 3
-class_weights = torch.tensor(weights, dtype=torch.float32)
-loss_fn = nn.CrossEntropyLoss(weight=class_weights)
-opt = torch.optim.Adam(model.parameters(), lr=0.001)
-
-epochs = 25
-for epoch in range(epochs):
-    model.train()
-    pred = model(X_train)
-    loss = loss_fn(pred, y_train)
+window = int(os.environ.get("PUMP_WINDOW", WINDOW))
+stride = int(os.environ.get("PUMP_WINDOW_STRIDE", 1))
+horizon = int(os.environ.get("PUMP_LABEL_HORIZON", 1))
+chunk = int(os.environ.get("PUMP_TRAIN_CHUNK", 1024))
+
+
+class WindowBatches:
+    """Map-style dataset whose items are whole batches: a list of window indices -> (X, y) tensors."""
+
+    SHARED = ("features", "labels", "starts")
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.shared = None
+
+    def share_memory(self):
+        """Move the dataset's arrays into shared memory; worker processes then get handles, not copies."""
+        state = self.dataset.__getstate__()
+        self.shared = {name: torch.from_numpy(np.ascontiguousarray(state[name])).share_memory_()
+                       for name in self.SHARED}
+        state.update((name, tensor.numpy()) for name, tensor in self.shared.items())
+        self.dataset.__setstate__(state)  # this process reads the shared copy too
+        return self
+
+    def __getstate__(self):
+        if self.shared is None:
+            return {"dataset": self.dataset.__getstate__(), "shared": None}
+        state = self.dataset.__getstate__()
+        for name in self.SHARED:
+            del state[name]
+        return {"dataset": state, "shared": self.shared}
+
+    def __setstate__(self, state):
+        self.shared = state["shared"]
+        dataset = state["dataset"]
+        if self.shared is not None:
+            dataset.update((name, tensor.numpy()) for name, tensor in self.shared.items())
+        self.dataset = WindowedDataset.__new__(WindowedDataset)
+        self.dataset.__setstate__(dataset)
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, idx):
+        idx = np.asarray(idx)
+        X = torch.from_numpy(self.dataset.windows(idx))
+        y = torch.from_numpy(self.dataset.targets(idx).astype(np.int64))
+        return X, y
+
+
+def save_checkpoint(path, model, opt, epoch, seed):
+    tmp = path + ".tmp"
+    torch.save({"model": model.state_dict(), "opt": opt.state_dict(), "epoch": epoch, "seed": seed}, tmp)
+    os.replace(tmp, path)
+
+
+def train_full_batch(model, opt, loss_fn, dataset, train_idx, total_weight):
+    """One step over all training windows; gradient accumulated over chunks."""
     opt.zero_grad()
-    loss.backward()
+    epoch_loss = 0.0
+    for X, y in dataset.batches(train_idx, chunk):
+        pred = model(torch.from_numpy(X))
+        loss = loss_fn(pred, torch.from_numpy(y.astype(np.int64))) / total_weight
+        loss.backward()
+        epoch_loss += loss.item()
     opt.step()
-    if (epoch + 1) % 5 == 0 or epoch == 0:
-        print("Epoch", epoch + 1, "Loss", round(loss.item(), 4))
-
-model.eval()
-with torch.no_grad():
-    test_pred = model(X_test)
-    test_cls = torch.argmax(test_pred, dim=1).numpy()
-acc = accuracy_score(y_test.numpy(), test_cls)
-print("\nTest accuracy:", round(acc * 100, 2), "%")
-print(classification_report(y_test.numpy(), test_cls, target_names=["Healthy", "Warning", "Fault"]))
-print("Confusion matrix:\n", confusion_matrix(y_test.numpy(), test_cls))
-
-model_path = os.path.join(script_dir, "pump_health_model.pth")
-torch.save(model.state_dict(), model_path)
-print("\nModel saved:", model_path)
+    return epoch_loss
+
+
+def train_mini_batch(model, opt, loss_fn, loader):
+    """One step per shuffled batch; returns the weighted mean loss over the epoch."""
+    total_loss = total_weight = 0.0
+    for X, y in loader:
+        pred = model(X)
+        batch_weight = float(loss_fn.weight[y].sum())
+        loss = loss_fn(pred, y) / batch_weight
+        opt.zero_grad()
+        loss.backward()
+        opt.step()
+        total_loss += loss.item() * batch_weight
+        total_weight += batch_weight
+    return total_loss / max(total_weight, 1e-12)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--epochs", type=int, default=25)
+    parser.add_argument("--batch-size", type=int, default=256, help="0 = full-batch (one step per epoch)")
+    parser.add_argument("--lr", type=float, default=0.001)
+    parser.add_argument("--workers", type=int, default=0, help="DataLoader worker processes")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = torch default)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--checkpoint", default=os.path.join(script_dir, "pump_health_checkpoint.pt"))
+    parser.add_argument("--resume", action="store_true", help="continue from --checkpoint")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    torch.manual_seed(args.seed)
+
+    features, labels, pumps = load_series(dataset_path(os.path.join(script_dir, "model_dataset")))
+    dataset = WindowedDataset(features, labels, window, stride, horizon, segments=pumps)
+    print("Windows:", len(dataset), "| series:", features.shape, "| window/stride/horizon:", window, stride, horizon)
+
+    train_idx, test_idx = train_test_split(np.arange(len(dataset)), test_size=0.2, random_state=42)
+    y_train = dataset.targets(train_idx).astype(np.int64)
+    y_test = dataset.targets(test_idx).astype(np.int64)
+
+    model = PumpGRU(input_size=4, hidden_size=32, num_classes=3)
+    # Class weights to handle imbalance (Healthy/Warning rarer in long runs)
+    class_counts = np.bincount(y_train, minlength=3)
+    weights = 1.0 / (class_counts + 1)
+    weights = weights / weights.sum() * 3
+    class_weights = torch.tensor(weights, dtype=torch.float32)
+    # Weighted mean = weighted sum / total weight (per batch, or over the whole set in full-batch mode)
+    loss_fn = nn.CrossEntropyLoss(weight=class_weights, reduction="sum")
+    total_weight = float(weights[y_train].sum())
+    opt = torch.optim.Adam(model.parameters(), lr=args.lr)
+
+    start_epoch = 0
+    if args.resume and os.path.exists(args.checkpoint):
+        state = torch.load(args.checkpoint, map_location="cpu")
+        model.load_state_dict(state["model"])
+        opt.load_state_dict(state["opt"])
+        start_epoch = state["epoch"] + 1
+        if state.get("seed", args.seed) != args.seed:
+            # The batch order is derived from the seed; keep the run's own
+            print("Using the checkpoint's seed", state["seed"], "instead of --seed", args.seed)
+            args.seed = state["seed"]
+        print("Resumed from", args.checkpoint, "at epoch", start_epoch + 1)
+
+    print("Mode:", "full-batch" if args.batch_size <= 0 else "mini-batch " + str(args.batch_size),
+          "| workers:", args.workers, "| threads:", torch.get_num_threads())
+    if args.batch_size > 0:
+        batches = WindowBatches(dataset)
+        if args.workers:
+            batches.share_memory()
+        order = torch.Generator()
+        sampler = BatchSampler(SubsetRandomSampler(train_idx, generator=order), args.batch_size, drop_last=False)
+        loader = DataLoader(batches, sampler=sampler, batch_size=None, num_workers=args.workers,
+                            prefetch_factor=4 if args.workers else None, persistent_workers=args.workers > 0)
+    trained = 0
+    train_start = time.perf_counter()
+    for epoch in range(start_epoch, args.epochs):
+        model.train()
+        epoch_start = time.perf_counter()
+        if args.batch_size <= 0:
+            epoch_loss = train_full_batch(model, opt, loss_fn, dataset, train_idx, total_weight)
+        else:
+            # Same seed + epoch -> same batch order, so --resume continues the same run
+            order.manual_seed(args.seed * 1000 + epoch)
+            epoch_loss = train_mini_batch(model, opt, loss_fn, loader)
+        elapsed = time.perf_counter() - epoch_start
+        trained += len(train_idx)
+        save_checkpoint(args.checkpoint, model, opt, epoch, args.seed)
+        print("Epoch", epoch + 1, "Loss", round(epoch_loss, 4),
+              "|", round(len(train_idx) / elapsed), "windows/s")
+
+    if trained:
+        print("Training throughput:", round(trained / (time.perf_counter() - train_start)), "windows/s")
+
+    model.eval()
+    test_cls = []
+    with torch.no_grad():
+        for X, _ in dataset.batches(test_idx, chunk):
+            test_cls.append(torch.argmax(model(torch.from_numpy(X)), dim=1).numpy())
+    test_cls = np.concatenate(test_cls)
+    acc = accuracy_score(y_test, test_cls)
+    print("\nTest accuracy:", round(acc * 100, 2), "%")
+    print(classification_report(y_test, test_cls, target_names=["Healthy", "Warning", "Fault"]))
+    print("Confusion matrix:\n", confusion_matrix(y_test, test_cls))
+
+    model_path = os.path.join(script_dir, "pump_health_model.pth")
+    torch.save(model.state_dict(), model_path)
+    print("\nModel saved:", model_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Sliding-window dataset over a raw (N, 4) series — no materialized X.npy.
+
+Windows are strided views into the base array (np.lib.stride_tricks), so
+memory scales with the series, not with windows x window length. A batch is
+only copied out when it is requested.
+
+Window k covers features[s : s + window] with s = starts[k]; its label is
+labels[s + window - 1 + horizon]. horizon=1 matches create_windows.py
+(labels[i + WINDOW]). Segments (one per pump in fleet datasets) are windowed
+separately, so no window spans two pumps.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class WindowedDataset:
+    def __init__(self, features, labels, window=50, stride=1, horizon=1, segments=None):
+        self.features = features = np.asarray(features)
+        self.labels = np.asarray(labels)
+        self.window, self.stride, self.horizon = window, stride, horizon
+        if segments is None:
+            segments = [(0, len(self.labels))]
+        self.starts = np.concatenate([
+            np.arange(start, stop - window - horizon + 1, stride, dtype=np.int64)
+            for start, stop in segments
+        ] + [np.empty(0, dtype=np.int64)])
+        self.view = self._make_view()
+
+    def _make_view(self):
+        # (N - window + 1, F, window) view -> (N - window + 1, window, F) view
+        features, window = self.features, self.window
+        if len(features) >= window:
+            return sliding_window_view(features, window, axis=0).transpose(0, 2, 1)
+        return np.empty((0, window, features.shape[1]), dtype=features.dtype)
+
+    def __getstate__(self):
+        # Pickling the view would write every window out in full (~window x
+        # the series); DataLoader workers under spawn/forkserver get a pickle.
+        state = self.__dict__.copy()
+        del state['view']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.view = self._make_view()
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, k):
+        """(window (window, F) view, label) — also usable as a torch Dataset."""
+        s = self.starts[k]
+        return self.view[s], self.labels[s + self.window - 1 + self.horizon]
+
+    def windows(self, idx):
+        """Windows for an array of dataset indices, copied into one (B, window, F) array."""
+        return np.ascontiguousarray(self.view[self.starts[idx]])
+
+    def targets(self, idx=None):
+        starts = self.starts if idx is None else self.starts[idx]
+        return self.labels[starts + self.window - 1 + self.horizon]
+
+    def input_stats(self, idx):
+        """Per-feature (mean, std) over the samples of windows idx, each row counted once per window holding it."""
+        starts = self.starts[idx]
+        n = len(self.features)
+        cover = np.bincount(starts, minlength=n + 1) - np.bincount(starts + self.window, minlength=n + 1)
+        weight = np.cumsum(cover[:n]).astype(np.float64)
+        mean = weight @ self.features / weight.sum()
+        var = weight @ (self.features - mean) ** 2 / weight.sum()
+        return mean, np.sqrt(var)
+
+    def batches(self, idx=None, batch_size=4096):
+        """Yield (X, y) batches over idx (default: all windows, in order)."""
+        if idx is None:
+            idx = np.arange(len(self))
+        for i in range(0, len(idx), batch_size):
+            part = idx[i:i + batch_size]
+            yield self.windows(part), self.targets(part)